@@ -8,7 +8,7 @@ from sqlalchemy import engine_from_config, pool
 
 from tgparser.db import Base
 from tgparser import models  # noqa: F401  # ensure models are imported for metadata
-from tgparser.settings import settings
+from tgparser.settings import get_settings
 
 config = context.config
 
@@ -23,7 +23,7 @@ target_metadata = Base.metadata
 def _database_url() -> str:
     # Prefer DATABASE_URL from env/.env via pydantic-settings.
     # Allow explicit env override as well.
-    return os.getenv("DATABASE_URL") or settings.database_url
+    return os.getenv("DATABASE_URL") or get_settings().database_url
 
 
 def run_migrations_offline() -> None:
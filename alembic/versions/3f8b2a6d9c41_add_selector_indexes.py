@@ -0,0 +1,47 @@
+"""add indexes backing the account selector
+
+Revision ID: 3f8b2a6d9c41
+Revises: 7d3a9c5e2f10
+Create Date: 2026-10-16
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "3f8b2a6d9c41"
+down_revision = "7d3a9c5e2f10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY can't run inside a transaction block.
+    with op.get_context().autocommit_block():
+        # Selector: ready accounts ORDER BY last_used_at ASC NULLS FIRST, id ASC.
+        # cooldown_until <= now() is not immutable, so it stays a filter.
+        op.create_index(
+            "ix_accounts_lru_ready",
+            "accounts",
+            [sa.text("last_used_at ASC NULLS FIRST"), "id"],
+            unique=False,
+            postgresql_where=sa.text("is_active AND status = 'active' AND session_string <> ''"),
+            postgresql_concurrently=True,
+        )
+        # Selector: LEFT JOIN memberships on (account_id, channel_id) filtered by status.
+        op.create_index(
+            "ix_acm_channel_status",
+            "account_channel_memberships",
+            ["channel_id", "status"],
+            unique=False,
+            postgresql_include=["account_id", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_acm_channel_status", table_name="account_channel_memberships", postgresql_concurrently=True)
+        op.drop_index("ix_accounts_lru_ready", table_name="accounts", postgresql_concurrently=True)
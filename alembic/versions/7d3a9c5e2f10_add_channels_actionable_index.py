@@ -0,0 +1,32 @@
+"""add partial index for actionable channels
+
+Revision ID: 7d3a9c5e2f10
+Revises: b1c2d3e4f5a6
+Create Date: 2026-10-16
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "7d3a9c5e2f10"
+down_revision = "b1c2d3e4f5a6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Parser selects channels with: is_active AND access_status <> 'forbidden' ORDER BY id.
+    op.create_index(
+        "ix_channels_actionable",
+        "channels",
+        ["id"],
+        unique=False,
+        postgresql_where=sa.text("is_active AND access_status <> 'forbidden'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_channels_actionable", table_name="channels")
@@ -0,0 +1,33 @@
+"""add accounts (is_active, cooldown_until) index
+
+Revision ID: 9a4e7c1b3d52
+Revises: 3f8b2a6d9c41
+Create Date: 2026-10-16
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+revision = "9a4e7c1b3d52"
+down_revision = "3f8b2a6d9c41"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Worker health checks: is_active AND (cooldown_until IS NULL OR cooldown_until <= now).
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_accounts_active_cooldown",
+            "accounts",
+            ["is_active", "cooldown_until"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_accounts_active_cooldown", table_name="accounts", postgresql_concurrently=True)
@@ -7,7 +7,7 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
 
 from tgparser.db import SessionLocal
-from tgparser.settings import settings
+from tgparser.settings import get_settings
 
 _security = HTTPBearer(auto_error=False)
 
@@ -22,7 +22,7 @@ def get_db() -> Generator[Session, None, None]:
 
 def require_token(creds: HTTPAuthorizationCredentials | None = Depends(_security)) -> None:
     # Fail-closed if token isn't configured.
-    expected = (getattr(settings, "service_api_token", "") or "").strip()
+    expected = (getattr(get_settings(), "service_api_token", "") or "").strip()
     if not expected:
         raise HTTPException(status_code=503, detail="SERVICE_API_TOKEN_not_configured")
 
@@ -5,7 +5,7 @@ import logging
 from aiogram import Bot
 
 from .botui import setup_dispatcher
-from .settings import settings
+from .settings import get_settings
 
 log = logging.getLogger(__name__)
 
@@ -14,7 +14,7 @@ dp = setup_dispatcher()
 
 async def main():
     logging.basicConfig(level=logging.INFO)
-    bot = Bot(token=settings.bot_token)
+    bot = Bot(token=get_settings().bot_token)
     await dp.start_polling(bot)
 
 
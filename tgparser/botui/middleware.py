@@ -7,7 +7,7 @@ from aiogram.types import CallbackQuery, Message, TelegramObject
 
 from ..db import SessionLocal
 from ..models import BotUser
-from ..settings import settings
+from ..settings import get_settings
 from ..user_tracking import track_user
 
 
@@ -51,7 +51,7 @@ class StaffGateMiddleware(BaseMiddleware):
     DENY_TEXT = "Доступ запрещен"
 
     def _is_admin_chat(self, chat_id: int | None, user_id: int | None) -> bool:
-        admin_chat_id = getattr(settings, "admin_chat_id", None)
+        admin_chat_id = getattr(get_settings(), "admin_chat_id", None)
         if not admin_chat_id:
             return False
         try:
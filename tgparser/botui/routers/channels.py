@@ -15,13 +15,13 @@ from sqlalchemy import select
 from ...db import SessionLocal
 from ...models import Channel, ChannelAccessStatus, ChannelType
 from ...telethon.dialogs import get_entity_from_dialogs
-from ...telethon.join_service import ensure_joined
-from ...telethon.pool import TelethonClientPool
+from ...telethon.join_service import ensure_joined, is_public_already_joined
 from ...telethon.selector import (
     AccountChannelStatus,
     pick_account_for_channel,
     upsert_membership,
 )
+from ...telethon_client import connected_client
 from .. import callbacks as cb
 
 log = logging.getLogger(__name__)
@@ -114,14 +114,19 @@ async def _attempt_join_on_add(*, channel_id: int) -> str:
         if not ch:
             return "(join: channel not found)"
 
+    # Nothing to do: skip the account pick and the Telegram connection entirely.
+    if is_public_already_joined(ch):
+        return "(join: already joined)"
+
     pick = pick_account_for_channel(ch=ch)
     acc = pick.account
     if acc is None:
         return "(join: no ready accounts; add/authorize a userbot account first)"
 
-    pool = TelethonClientPool()
+    # Short-lived client: the bot process must not keep a connection open on an auth key the
+    # worker's shared pool also uses (two live connections per key risk AUTH_KEY_DUPLICATED).
     try:
-        async with pool.connected(account=acc) as client:
+        async with connected_client(account=acc) as client:
             if not await client.is_user_authorized():
                 return f"(join: account #{acc.id} is not authorized)"
 
@@ -1,8 +1,10 @@
 from __future__ import annotations
 
+import json
 import logging
 
 import redis.asyncio as redis
+from redis.exceptions import ResponseError
 from sqlalchemy import select
 from aiogram import Router
 from aiogram.exceptions import TelegramBadRequest
@@ -11,7 +13,7 @@ from aiogram.types import CallbackQuery, Message
 
 from ...db import SessionLocal
 from ...models import Account, Channel
-from ...settings import settings
+from ...settings import get_settings
 from ...user_tracking import track_user
 from ...worker import LAST_TICK_KEY
 from .. import callbacks as cb
@@ -24,25 +26,29 @@ router = Router()
 
 
 async def _status_body() -> str:
-    r = redis.from_url(settings.redis_url)
-    data = await r.hgetall(LAST_TICK_KEY)
+    r = redis.from_url(get_settings().redis_url)
+    try:
+        raw = await r.get(LAST_TICK_KEY)
+        data = json.loads(raw) if raw else {}
+    except (ResponseError, ValueError):
+        # Legacy hash value (before the first tick on the new format) or a corrupt payload.
+        data = {}
 
     if not data:
         return (
             "Пока нет данных о тике.\n\n"
-            "Воркeр ещё не завершал тик или Redis был очищен.\n"
+            "Воркeр ещё не завершал тик, давно не тикал (данные устаревают через 3 интервала) "
+            "или Redis был очищен.\n"
             "Попробуйте позже (после следующего тика)."
         )
 
-    # redis-py returns dict[bytes, bytes]
     def _get(key: str, default: str = "?") -> str:
-        v = data.get(key.encode())
+        v = data.get(key)
         if v is None:
             return default
-        try:
-            return v.decode()
-        except Exception:
-            return default
+        if key == "duration_s" and isinstance(v, (int, float)):
+            return f"{v:.3f}"
+        return str(v)
 
     return (
         "Последний тик:\n"
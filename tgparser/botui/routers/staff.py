@@ -6,13 +6,13 @@ from aiogram.types import Message
 
 from ...db import SessionLocal
 from ...models import BotUser
-from ...settings import settings
+from ...settings import get_settings
 
 router = Router()
 
 
 def _is_admin_chat(m: Message) -> bool:
-    admin_chat_id = getattr(settings, "admin_chat_id", None)
+    admin_chat_id = getattr(get_settings(), "admin_chat_id", None)
     if not admin_chat_id or not m.chat:
         return False
     try:
@@ -3,10 +3,20 @@ from __future__ import annotations
 from sqlalchemy import create_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
-from .settings import settings
+from .settings import get_settings
 
 
-engine = create_engine(settings.database_url, pool_pre_ping=True)
+_settings = get_settings()
+
+# The worker idles for tick_interval_seconds between ticks: pre-ping + recycle avoid failing the
+# first query of a tick on a connection the server already dropped.
+engine = create_engine(
+    _settings.database_url,
+    pool_pre_ping=True,
+    pool_recycle=_settings.db_pool_recycle_seconds,
+    pool_size=_settings.db_pool_size,
+    max_overflow=_settings.db_max_overflow,
+)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
 
@@ -11,7 +11,7 @@ from .db import SessionLocal
 from .models import Account, AccountStatus, AccountChannelMembership, Channel, ChannelType
 from .telethon.dialogs import get_entity_from_dialogs
 from .telethon.join_service import ensure_joined
-from .telethon.pool import TelethonClientPool
+from .telethon.pool import get_shared_pool
 from .telethon.selector import AccountChannelStatus, upsert_membership
 
 log = logging.getLogger(__name__)
@@ -27,7 +27,7 @@ ERROR_RETRY_EVERY = timedelta(minutes=30)
 JOINED_REFRESH_EVERY = timedelta(hours=24)
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class MembershipSummary:
     channels_total: int = 0
     channels_touched: int = 0
@@ -83,7 +83,7 @@ def _should_recheck(last_checked_at: datetime | None, *, every: timedelta, now:
     return last_checked_at + every <= now
 
 
-async def ensure_membership_once(*, max_channels: int = 50) -> MembershipSummary:
+async def ensure_membership_once(*, max_channels: int = 50, now: datetime | None = None) -> MembershipSummary:
     """Best-effort membership maintenance.
 
     Goal: proactively keep account/channel membership in sync so parsing doesn't waste ticks
@@ -96,7 +96,7 @@ async def ensure_membership_once(*, max_channels: int = 50) -> MembershipSummary
     - Keep work bounded per tick.
     """
 
-    now = _now()
+    now = now or _now()
 
     with SessionLocal() as db:
         channels = list(
@@ -122,11 +122,12 @@ async def ensure_membership_once(*, max_channels: int = 50) -> MembershipSummary
     if not channels or not accounts:
         return summary
 
-    pool = TelethonClientPool()
+    pool = get_shared_pool()
 
     memberships_updated = 0
     cooldown_marked = 0
     touched = 0
+    dialogs_refreshed: set[int] = set()
 
     # Ensure membership for multiple accounts (bounded): owner expects attached accounts to be
     # actually joined/subscribed, so dialogs cache can be used and get_entity calls reduced.
@@ -199,8 +200,13 @@ async def ensure_membership_once(*, max_channels: int = 50) -> MembershipSummary
             if not _should_recheck(mem_last_checked, every=JOINED_REFRESH_EVERY, now=now):
                 continue
             try:
+                # Drift check must see current dialogs, not the pooled client's cached index;
+                # reload at most once per account per pass (get_dialogs is rate-limited).
                 async with pool.connected(account=acc) as client:
-                    entity = await get_entity_from_dialogs(client=client, ch=ch)
+                    entity = await get_entity_from_dialogs(
+                        client=client, ch=ch, refresh=acc.id not in dialogs_refreshed
+                    )
+                dialogs_refreshed.add(acc.id)
                 if entity is None:
                     # Membership drift; keep status but record note.
                     upsert_membership(
@@ -3,7 +3,7 @@ from __future__ import annotations
 import enum
 from datetime import datetime
 
-from sqlalchemy import BigInteger, Boolean, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy import BigInteger, Boolean, DateTime, Enum, ForeignKey, Index, Integer, String, Text, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -75,6 +75,19 @@ class Account(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
 
+    __table_args__ = (
+        # Health-check pass: active accounts whose cooldown has expired (or never set).
+        Index("ix_accounts_active_cooldown", "is_active", "cooldown_until"),
+        # Selector LRU pick: ready accounts already in (last_used_at NULLS FIRST, id) order, no sort node.
+        # cooldown_until is time-dependent (not immutable), so it stays a filter outside the predicate.
+        Index(
+            "ix_accounts_lru_ready",
+            text("last_used_at ASC NULLS FIRST"),
+            "id",
+            postgresql_where=text("is_active AND status = 'active' AND session_string <> ''"),
+        ),
+    )
+
 
 class Channel(Base):
     __tablename__ = "channels"
@@ -108,6 +121,12 @@ class Channel(Base):
 
     __table_args__ = (
         UniqueConstraint("type", "identifier", name="uq_channel_type_identifier"),
+        # Parser channel selection: active and not forbidden.
+        Index(
+            "ix_channels_actionable",
+            "id",
+            postgresql_where=text("is_active AND access_status <> 'forbidden'"),
+        ),
     )
 
 
@@ -134,6 +153,8 @@ class AccountChannelMembership(Base):
 
     __table_args__ = (
         UniqueConstraint("account_id", "channel_id", name="uq_account_channel"),
+        # Selector LEFT JOIN on channel_id + status filter, covering account_id.
+        Index("ix_acm_channel_status", "channel_id", "status", postgresql_include=["account_id", "id"]),
     )
 
 
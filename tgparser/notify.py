@@ -6,7 +6,7 @@ from aiogram import Bot
 
 from .db import SessionLocal
 from .models import BotUser
-from .settings import settings
+from .settings import get_settings
 
 log = logging.getLogger(__name__)
 
@@ -21,11 +21,11 @@ async def notify_admin(text: str) -> None:
     Requires ADMIN_CHAT_ID in env. Never raises.
     """
 
-    chat_id = getattr(settings, "admin_chat_id", None)
+    chat_id = getattr(get_settings(), "admin_chat_id", None)
     if not chat_id:
         return
 
-    bot = Bot(token=settings.bot_token)
+    bot = Bot(token=get_settings().bot_token)
     try:
         await _send(bot, chat_id=int(chat_id), text=text)
     except Exception:
@@ -44,7 +44,7 @@ async def notify_team(text: str) -> None:
     (optionally also require notify_enabled=true).
     """
 
-    bot = Bot(token=settings.bot_token)
+    bot = Bot(token=get_settings().bot_token)
     try:
         with SessionLocal() as db:
             user_ids = (
@@ -1,11 +1,14 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import select
+from sqlalchemy import select, text, update
 from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
 from telethon import errors
 
 from .db import SessionLocal
@@ -19,15 +22,16 @@ from .models import (
     Post,
 )
 from .notify import notify_admin, notify_team
+from .settings import get_settings
 from .telethon.account_service import TelethonConfigError
-from .telethon.dialogs import get_entity_from_dialogs
+from .telethon.dialogs import get_cached_dialog_entity, get_entity_from_dialogs
 from .telethon.join_service import ensure_joined
-from .telethon.pool import TelethonClientPool
+from .telethon.pool import TelethonClientPool, get_shared_pool
 from .telethon.selector import (
     AccountChannelStatus,
     mark_account_used,
     pick_account_for_channel,
-    upsert_membership,
+    upsert_memberships,
 )
 
 log = logging.getLogger(__name__)
@@ -92,7 +96,18 @@ def _quarantine_account(*, account_id: int, status: AccountStatus, note: str, no
         db.commit()
 
 
-@dataclass(frozen=True)
+def _mark_channels_checked(*, channel_ids: list[int], now: datetime) -> None:
+    """Bump last_checked_at for all channels visited in this pass with one UPDATE."""
+
+    if not channel_ids:
+        return
+
+    with SessionLocal() as db:
+        db.execute(update(Channel).where(Channel.id.in_(channel_ids)).values(last_checked_at=now))
+        db.commit()
+
+
+@dataclass(frozen=True, slots=True)
 class ParseSummary:
     channels_total: int = 0
     channels_checked: int = 0
@@ -100,6 +115,58 @@ class ParseSummary:
     posts_inserted: int = 0
 
 
+# Channel-level access result -> per-account membership status for the selector.
+_ACCESS_TO_MEMBERSHIP: dict[ChannelAccessStatus, AccountChannelStatus] = {
+    ChannelAccessStatus.joined: AccountChannelStatus.joined,
+    ChannelAccessStatus.join_requested: AccountChannelStatus.join_requested,
+    ChannelAccessStatus.pending_approval: AccountChannelStatus.pending_approval,
+    ChannelAccessStatus.forbidden: AccountChannelStatus.forbidden,
+    ChannelAccessStatus.error: AccountChannelStatus.error,
+}
+
+_PENDING_MEMBERSHIP_STATUSES = {AccountChannelStatus.join_requested, AccountChannelStatus.pending_approval}
+
+
+def _join_blocked_reason(
+    *,
+    account_id: int,
+    channel_id: int,
+    pending_upserts: list[tuple[int, int, AccountChannelStatus, str]],
+) -> str | None:
+    """Return why a private join must not be attempted for this account, or None.
+
+    Avoid spamming join requests: if this account already requested/pending, do not call
+    ImportChatInvite again; and never send a second join request if ANY account already has
+    a pending/join_requested membership for this channel (including the not-yet-flushed
+    ones from this channel pass).
+    """
+
+    with SessionLocal() as db:
+        m = db.execute(
+            select(AccountChannelMembership.status).where(
+                AccountChannelMembership.account_id == account_id,
+                AccountChannelMembership.channel_id == channel_id,
+            )
+        ).first()
+        mem_status = m[0] if m else None
+
+    if mem_status in _PENDING_MEMBERSHIP_STATUSES:
+        return "self_pending"
+
+    if any(st in _PENDING_MEMBERSHIP_STATUSES for _, _, st, _ in pending_upserts):
+        return "other_account_pending"
+
+    with SessionLocal() as db:
+        any_pending = db.execute(
+            select(AccountChannelMembership.id).where(
+                AccountChannelMembership.channel_id == channel_id,
+                AccountChannelMembership.status.in_(list(_PENDING_MEMBERSHIP_STATUSES)),
+            )
+        ).first()
+
+    return "other_account_pending" if any_pending else None
+
+
 def _is_account_ready(acc: Account, *, now: datetime) -> bool:
     if not acc.is_active:
         return False
@@ -112,486 +179,581 @@ def _is_account_ready(acc: Account, *, now: datetime) -> bool:
     return True
 
 
-def _channel_is_actionable(ch: Channel) -> bool:
-    if not ch.is_active:
-        return False
-    # v1 rule: we still *try* to ensure_joined before parsing.
-    # Hard skip only if we already know it's forbidden.
-    if ch.access_status == ChannelAccessStatus.forbidden:
-        return False
-    return True
-
-
 def _normalize_text(text: str | None) -> str:
     return (text or "").strip()
 
 
-def _build_message_url(*, ch: Channel, entity, message_id: int) -> str:
+def _to_utc(value) -> datetime | None:
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _message_url_prefix(*, ch: Channel, entity) -> str:
+    """URL prefix for channel messages (append message id), or "" if unknown."""
+
     # Public channels: stable canonical URL.
     username = (getattr(entity, "username", None) or ch.identifier or "").lstrip("@").strip()
     if username:
-        return f"https://t.me/{username}/{message_id}"
+        return f"https://t.me/{username}/"
 
     # Private channels: best-effort.
     ent_id = getattr(entity, "id", None)
     if isinstance(ent_id, int) and ent_id > 0:
-        return f"https://t.me/c/{ent_id}/{message_id}"
+        return f"https://t.me/c/{ent_id}/"
 
     return ""
 
 
-async def parse_new_posts_once() -> ParseSummary:
-    """Parse new posts for all active channels, incrementally."""
+# Backfills above this size go through COPY into a temp staging table instead of a
+# single multi-VALUES INSERT (much faster for thousands of rows, less WAL churn).
+COPY_INSERT_THRESHOLD = 500
 
-    now = datetime.now(timezone.utc)
+_POST_COPY_COLUMNS = ("channel_id", "message_id", "original_url", "published_at", "text", "created_at")
 
-    with SessionLocal() as db:
-        channels = list(db.execute(select(Channel).order_by(Channel.id.asc())).scalars())
-        actionable_channels = [c for c in channels if _channel_is_actionable(c)]
 
-    summary = ParseSummary(channels_total=len(actionable_channels))
+def _insert_posts(db: Session, rows: list[dict]) -> int:
+    """Insert posts, skipping duplicates. Returns the number of inserted rows."""
 
-    if not actionable_channels:
-        log.info("parser: no actionable channels")
-        return summary
+    if not rows:
+        return 0
 
-    # Accounts are selected per-channel (rotation + membership-aware).
+    if len(rows) < COPY_INSERT_THRESHOLD:
+        # NOTE: psycopg3 may report rowcount=-1 for INSERT .. ON CONFLICT.
+        # Use RETURNING to get an accurate inserted count (length of returned ids).
+        stmt = insert(Post).values(rows)
+        stmt = stmt.on_conflict_do_nothing(index_elements=[Post.channel_id, Post.message_id])
+        stmt = stmt.returning(Post.id)
+        return len(db.execute(stmt).fetchall())
 
-    inserted_total = 0
-    checked = 0
+    cols = ", ".join(_POST_COPY_COLUMNS)
+    db.execute(
+        text(
+            "CREATE TEMP TABLE IF NOT EXISTS posts_staging ("
+            "channel_id integer, message_id integer, original_url varchar(500), "
+            "published_at timestamptz, text text, created_at timestamptz"
+            ") ON COMMIT DROP"
+        )
+    )
 
-    pool = TelethonClientPool()
+    # COPY is not exposed by SQLAlchemy; stream through the session's psycopg connection
+    # so the staging rows live in the same transaction.
+    raw = db.connection().connection.dbapi_connection
+    with raw.cursor() as cur:
+        with cur.copy(f"COPY posts_staging ({cols}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(tuple(row[c] for c in _POST_COPY_COLUMNS))
+
+    res = db.execute(
+        text(
+            f"INSERT INTO posts ({cols}) SELECT {cols} FROM posts_staging "
+            "ON CONFLICT (channel_id, message_id) DO NOTHING RETURNING id"
+        )
+    )
+    inserted = len(res.fetchall())
+    db.execute(text("TRUNCATE posts_staging"))
+    return inserted
 
-    for ch in actionable_channels:
-        checked += 1
 
-        last_exc: Exception | None = None
-        parsed = False
+async def _parse_channel(
+    *,
+    ch: Channel,
+    pool: TelethonClientPool,
+    now: datetime,
+    busy_accounts: set[int],
+) -> int:
+    """Parse one channel, trying up to 8 accounts. Returns the number of inserted posts.
 
-        exclude: set[int] = set()
-        attempts = 0
+    Raises TelethonConfigError (global config problem) to the caller.
+    """
 
-        while attempts < 8:
-            attempts += 1
-            pick = pick_account_for_channel(ch=ch, exclude_account_ids=exclude)
-            acc = pick.account
-            if acc is None:
-                break
+    last_exc: Exception | None = None
+    parsed = False
 
-            log.info(
-                "selector: channel_id=%s channel_type=%s picked_account_id=%s reason=%s",
-                ch.id,
-                ch.type,
-                acc.id,
-                pick.reason,
-            )
+    exclude: set[int] = set()
+    attempts = 0
+    # The channel is marked forbidden only if every account tried was refused access.
+    accounts_tried = 0
+    forbidden_hits = 0
 
-            try:
-                async with pool.connected(account=acc) as client:
-                    if not await client.is_user_authorized():
-                        _mark_account_auth_required(
-                            account_id=acc.id,
-                            note="Telethon session is not authorized",
-                            now=now,
+    # Membership writes for this channel are collected and flushed in one bulk upsert.
+    pending_upserts: list[tuple[int, int, AccountChannelStatus, str]] = []
+
+    # Load the channel row once and keep the instance resident across account attempts.
+    # Writes re-attach it to a short-lived session (expire_on_commit=False keeps it loaded).
+    with SessionLocal(expire_on_commit=False) as db:
+        db_ch = db.get(Channel, ch.id)
+    if not db_ch:
+        return 0
+
+    inserted_total = 0
+
+    while attempts < 8:
+        attempts += 1
+        # Prefer accounts not busy with other channels right now, so concurrent channel
+        # passes spread across distinct accounts instead of queueing on one client lock.
+        pick = pick_account_for_channel(ch=ch, exclude_account_ids=exclude | busy_accounts, now=now)
+        if pick.account is None and busy_accounts:
+            pick = pick_account_for_channel(ch=ch, exclude_account_ids=exclude, now=now)
+        acc = pick.account
+        if acc is None:
+            break
+
+        log.info(
+            "selector: channel_id=%s channel_type=%s picked_account_id=%s reason=%s",
+            ch.id,
+            ch.type,
+            acc.id,
+            pick.reason,
+        )
+
+        accounts_tried += 1
+        busy_accounts.add(acc.id)
+        try:
+            async with pool.connected(account=acc) as client:
+                if not await client.is_user_authorized():
+                    _mark_account_auth_required(
+                        account_id=acc.id,
+                        note="Telethon session is not authorized",
+                        now=now,
+                    )
+                    exclude.add(acc.id)
+                    continue
+
+                # 1) Prefer dialogs entity (membership-aware) to avoid resolve username.
+                # NOTE: get_dialogs is rate-limited aggressively. For public channels we
+                # prefer direct username resolve first; dialogs lookup is mainly useful for
+                # private channels where membership already exists.
+                entity = None
+                join_task: asyncio.Task | None = None
+                join_blocked: str | None = None
+                if db_ch.type != ChannelType.public:
+                    dialogs_task = asyncio.create_task(get_entity_from_dialogs(client=client, ch=db_ch))
+
+                    # Optional: speculatively start the join while dialogs are loading for channels
+                    # we are likely not a member of. Off by default: cancelling an in-flight join
+                    # can leave Telegram-side state ambiguous until the next dialogs check.
+                    if get_settings().speculative_join and db_ch.access_status not in {
+                        ChannelAccessStatus.joined,
+                        ChannelAccessStatus.active,
+                    }:
+                        join_blocked = _join_blocked_reason(
+                            account_id=acc.id, channel_id=ch.id, pending_upserts=pending_upserts
+                        )
+                        if join_blocked is None:
+                            join_task = asyncio.create_task(ensure_joined(client=client, ch=db_ch))
+
+                    try:
+                        entity = await dialogs_task
+                    except BaseException:
+                        if join_task is not None:
+                            join_task.cancel()
+                        raise
+
+                # If the entity is already visible in dialogs, treat this (account,channel)
+                # as joined for selector purposes (e.g. after a private join request was approved).
+                if entity is not None:
+                    pending_upserts.append((acc.id, ch.id, AccountChannelStatus.joined, "entity found in dialogs"))
+
+                # 1.1) If not in dialogs, try to resolve entity directly.
+                # For public channels this should work even without membership.
+                if entity is None:
+                    try:
+                        if db_ch.type == ChannelType.public:
+                            # Dialogs already loaded for this client (private channels earlier
+                            # in the tick) answer joined public channels without a resolve RPC.
+                            entity = get_cached_dialog_entity(client=client, ch=db_ch)
+                            ident = (db_ch.identifier or "").strip()
+                            if entity is None and ident:
+                                entity = await client.get_entity(ident)
+                        else:
+                            # Private: best-effort by numeric peer id if we have it.
+                            if isinstance(db_ch.peer_id, int) and db_ch.peer_id:
+                                entity = await client.get_entity(int(db_ch.peer_id))
+                    except Exception:
+                        entity = None
+
+                if entity is not None and join_task is not None:
+                    join_task.cancel()
+
+                # 2) If still not found, try to join (public: JoinChannel, private: ImportChatInvite).
+                # NOTE: For v1 we only attempt joining for private channels.
+                # Private channels are identified by invite hash; dialogs lookup requires peer_id.
+                # If entity is missing we must attempt ensure_joined even if access_status was already
+                # marked active/joined (e.g. channel added earlier but peer_id wasn't captured yet).
+                if entity is None and db_ch.type == ChannelType.private:
+                    if join_task is None and join_blocked is None:
+                        join_blocked = _join_blocked_reason(
+                            account_id=acc.id, channel_id=ch.id, pending_upserts=pending_upserts
                         )
+
+                    if join_blocked == "self_pending":
                         exclude.add(acc.id)
                         continue
 
-                    # 1) Prefer dialogs entity (membership-aware) to avoid resolve username.
-                    with SessionLocal() as db:
-                        db_ch = db.get(Channel, ch.id)
-                        if not db_ch:
-                            parsed = True
-                            break
-
-                    # NOTE: get_dialogs is rate-limited aggressively. For public channels we
-                    # prefer direct username resolve first; dialogs lookup is mainly useful for
-                    # private channels where membership already exists.
-                    entity = None
-                    if db_ch.type != ChannelType.public:
-                        entity = await get_entity_from_dialogs(client=client, ch=db_ch)
-
-                    # If the entity is already visible in dialogs, treat this (account,channel)
-                    # as joined for selector purposes (e.g. after a private join request was approved).
-                    if entity is not None:
-                        upsert_membership(
-                            account_id=acc.id,
-                            channel_id=ch.id,
-                            status=AccountChannelStatus.joined,
-                            note="entity found in dialogs",
-                            now=now,
+                    if join_blocked:
+                        log.info(
+                            "join_guardrail: channel_id=%s skip_join account_id=%s reason=%s",
+                            ch.id,
+                            acc.id,
+                            join_blocked,
                         )
+                        exclude.add(acc.id)
+                        continue
 
-                    # 1.1) If not in dialogs, try to resolve entity directly.
-                    # For public channels this should work even without membership.
-                    if entity is None:
-                        try:
-                            if db_ch.type == ChannelType.public:
-                                ident = (db_ch.identifier or "").strip()
-                                if ident:
-                                    entity = await client.get_entity(ident)
-                            else:
-                                # Private: best-effort by numeric peer id if we have it.
-                                if isinstance(db_ch.peer_id, int) and db_ch.peer_id:
-                                    entity = await client.get_entity(int(db_ch.peer_id))
-                        except Exception:
-                            entity = None
-
-                    # 2) If still not found, try to join (public: JoinChannel, private: ImportChatInvite).
-                    # Avoid spamming join requests: if we already requested/pending for this account,
-                    # do not call ImportChatInvite again.
-                    # NOTE: For v1 we only attempt joining for private channels.
-                    # Private channels are identified by invite hash; dialogs lookup requires peer_id.
-                    # If entity is missing we must attempt ensure_joined even if access_status was already
-                    # marked active/joined (e.g. channel added earlier but peer_id wasn't captured yet).
-                    if entity is None and db_ch.type == ChannelType.private:
-                        with SessionLocal() as db:
-                            m = db.execute(
-                                select(AccountChannelMembership.status).where(
-                                    AccountChannelMembership.account_id == acc.id,
-                                    AccountChannelMembership.channel_id == ch.id,
-                                )
-                            ).first()
-                            mem_status = m[0] if m else None
-
-                        if mem_status in {AccountChannelStatus.join_requested, AccountChannelStatus.pending_approval}:
-                            exclude.add(acc.id)
-                            continue
-
-                        # Guardrail: never send a second join request if ANY account already has
-                        # a pending/join_requested membership for this channel.
-                        with SessionLocal() as db:
-                            any_pending = db.execute(
-                                select(AccountChannelMembership.id).where(
-                                    AccountChannelMembership.channel_id == ch.id,
-                                    AccountChannelMembership.status.in_(
-                                        [
-                                            AccountChannelStatus.join_requested,
-                                            AccountChannelStatus.pending_approval,
-                                        ]
-                                    ),
-                                )
-                            ).first()
-
-                        if any_pending:
-                            log.info(
-                                "join_guardrail: channel_id=%s skip_join account_id=%s reason=other_account_pending",
-                                ch.id,
-                                acc.id,
-                            )
-                            exclude.add(acc.id)
-                            continue
-
+                    if join_task is not None:
+                        join_res = await join_task
+                    else:
                         join_res = await ensure_joined(client=client, ch=db_ch)
 
-                        # Track per-account membership state for selector.
-                        if join_res.access_status == ChannelAccessStatus.joined:
-                            upsert_membership(
-                                account_id=acc.id,
-                                channel_id=ch.id,
-                                status=AccountChannelStatus.joined,
-                                note=join_res.note,
-                                now=now,
-                            )
-                        elif join_res.access_status == ChannelAccessStatus.join_requested:
-                            upsert_membership(
-                                account_id=acc.id,
-                                channel_id=ch.id,
-                                status=AccountChannelStatus.join_requested,
-                                note=join_res.note,
-                                now=now,
-                            )
-                        elif join_res.access_status == ChannelAccessStatus.pending_approval:
-                            upsert_membership(
-                                account_id=acc.id,
-                                channel_id=ch.id,
-                                status=AccountChannelStatus.pending_approval,
-                                note=join_res.note,
-                                now=now,
-                            )
-                        elif join_res.access_status == ChannelAccessStatus.forbidden:
-                            upsert_membership(
-                                account_id=acc.id,
-                                channel_id=ch.id,
-                                status=AccountChannelStatus.forbidden,
-                                note=join_res.note,
-                                now=now,
-                            )
-                        elif join_res.access_status == ChannelAccessStatus.error:
-                            upsert_membership(
-                                account_id=acc.id,
-                                channel_id=ch.id,
-                                status=AccountChannelStatus.error,
-                                note=join_res.note,
-                                now=now,
-                            )
-
-                        with SessionLocal() as db:
-                            ch2 = db.get(Channel, ch.id)
-                            if ch2:
-                                ch2.last_checked_at = now
-                                if join_res.access_status is not None:
-                                    ch2.access_status = join_res.access_status
-                                ch2.last_error = join_res.note if not join_res.ok else ""
-
-                                ent = join_res.entity
-                                ent_id = getattr(ent, "id", None)
-                                if isinstance(ent_id, int) and ent_id:
-                                    ch2.peer_id = int(ent_id)
-                                ent_title = getattr(ent, "title", None)
-                                if isinstance(ent_title, str) and ent_title.strip():
-                                    ch2.title = ent_title.strip()
-
-                                db.commit()
-
-                        if join_res.ok:
-                            # Try dialogs again after joining.
-                            with SessionLocal() as db:
-                                db_ch = db.get(Channel, ch.id)
-                            if db_ch:
-                                entity = join_res.entity or await get_entity_from_dialogs(client=client, ch=db_ch)
-
-                    if entity is None:
-                        # Not parsable for this account in this tick; exclude it so selector doesn't
-                        # re-pick the same account in a tight loop (common when there is only one).
+                    if join_res.retry_after is not None:
+                        # FloodWait on join: cool the account down so the selector skips it
+                        # until Telegram allows it again, instead of re-dispatching next tick.
+                        _mark_account_cooldown(
+                            account_id=acc.id,
+                            seconds=int((join_res.retry_after - now).total_seconds()),
+                            note=join_res.note,
+                            now=now,
+                        )
                         exclude.add(acc.id)
-                        continue
 
-                    # 3) Parse posts.
-                    with SessionLocal() as db:
-                        db_ch = db.get(Channel, ch.id)
-                        if not db_ch:
-                            parsed = True
-                            break
+                    # Track per-account membership state for selector.
+                    mem_status = _ACCESS_TO_MEMBERSHIP.get(join_res.access_status)
+                    if mem_status is not None:
+                        pending_upserts.append((acc.id, ch.id, mem_status, join_res.note))
+
+                    with SessionLocal(expire_on_commit=False) as db:
+                        db.add(db_ch)
+                        if join_res.access_status is not None:
+                            db_ch.access_status = join_res.access_status
+                        db_ch.last_error = join_res.note if not join_res.ok else ""
+
+                        ent = join_res.entity
+                        ent_id = getattr(ent, "id", None)
+                        if isinstance(ent_id, int) and ent_id:
+                            db_ch.peer_id = int(ent_id)
+                        ent_title = getattr(ent, "title", None)
+                        if isinstance(ent_title, str) and ent_title.strip():
+                            db_ch.title = ent_title.strip()
 
-                        # If entity exists, channel is accessible.
-                        if db_ch.access_status not in {ChannelAccessStatus.active, ChannelAccessStatus.joined}:
-                            db_ch.access_status = ChannelAccessStatus.joined
-
-                        cursor = int(db_ch.cursor_message_id or 0)
-
-                        # Safety: if cursor is set but DB has no posts yet (e.g. previous failed run
-                        # advanced cursor without inserts), treat as first-parse to avoid permanent
-                        # "0 inserted" loops.
-                        if cursor > 0:
-                            any_post = db.execute(
-                                select(Post.id).where(Post.channel_id == db_ch.id).limit(1)
-                            ).first()
-                            if not any_post:
-                                cursor = 0
-
-                        max_seen_id = cursor
-                        rows: list[dict] = []
-
-                        backfill_days = max(0, int(db_ch.backfill_days or 0))
-                        backfill_since: datetime | None = None
-
-                        if cursor <= 0 and backfill_days > 0:
-                            # First parse for a channel: backfill up to N days of history.
-                            # We bound the total amount to avoid infinite history walks.
-                            backfill_since = now - timedelta(days=backfill_days)
-                            msg_iter = client.iter_messages(entity, limit=2000)
-                        elif cursor <= 0:
-                            # Default first parse when backfill is disabled.
-                            msg_iter = client.iter_messages(entity, limit=20)
-                        else:
-                            # Incremental: fetch messages after the cursor.
-                            msg_iter = client.iter_messages(entity, min_id=cursor, reverse=True)
-
-                        async for msg in msg_iter:
-                            published_at = getattr(msg, "date", None)
-                            if not isinstance(published_at, datetime):
-                                published_at = now
-                            if published_at.tzinfo is None:
-                                published_at = published_at.replace(tzinfo=timezone.utc)
-
-                            if backfill_since is not None and published_at < backfill_since:
-                                # Backfill mode: stop once we reached older than the threshold.
-                                break
-
-                            text = _normalize_text(getattr(msg, "message", None))
-                            if not text:
-                                continue
-
-                            mid = int(getattr(msg, "id", 0) or 0)
-                            if mid <= cursor:
-                                continue
-
-                            max_seen_id = max(max_seen_id, mid)
-
-                            rows.append(
-                                {
-                                    "channel_id": db_ch.id,
-                                    "message_id": mid,
-                                    "original_url": _build_message_url(ch=db_ch, entity=entity, message_id=mid),
-                                    "published_at": published_at,
-                                    "text": text,
-                                    "created_at": now,
-                                }
-                            )
-
-                        inserted = 0
-                        if rows:
-                            # NOTE: psycopg3 may report rowcount=-1 for INSERT .. ON CONFLICT.
-                            # Use RETURNING to get an accurate inserted count (length of returned ids).
-                            stmt = insert(Post).values(rows)
-                            stmt = stmt.on_conflict_do_nothing(index_elements=[Post.channel_id, Post.message_id])
-                            stmt = stmt.returning(Post.id)
-                            res = db.execute(stmt)
-                            inserted = len(res.fetchall())
-
-                        db_ch.cursor_message_id = max_seen_id if max_seen_id > cursor else cursor
-                        db_ch.last_checked_at = now
-                        db_ch.last_error = ""
                         db.commit()
 
-                        inserted_total += inserted
-
-                        mode = "backfill" if cursor <= 0 and backfill_since is not None else "incremental"
-                        log.info(
-                            "parser: mode=%s channel=%s ident=%s cursor=%s->%s fetched=%s inserted=%s account_id=%s",
-                            mode,
-                            db_ch.id,
-                            db_ch.identifier,
-                            cursor,
-                            db_ch.cursor_message_id,
-                            len(rows),
-                            inserted,
-                            acc.id,
-                        )
+                    if join_res.ok:
+                        # Try dialogs again after joining.
+                        entity = join_res.entity or await get_entity_from_dialogs(client=client, ch=db_ch)
+
+                if entity is None:
+                    # Not parsable for this account in this tick; exclude it so selector doesn't
+                    # re-pick the same account in a tight loop (common when there is only one).
+                    exclude.add(acc.id)
+                    continue
+
+                # 3) Parse posts.
+                # No DB session is held across the Telegram fetch below: with many channels in
+                # flight, sessions parked on `async for` would exhaust the connection pool and
+                # the next sync checkout would block the event loop. Read, fetch, then write.
+                cursor = int(db_ch.cursor_message_id or 0)
+
+                # Safety: if cursor is set but DB has no posts yet (e.g. previous failed run
+                # advanced cursor without inserts), treat as first-parse to avoid permanent
+                # "0 inserted" loops.
+                if cursor > 0:
+                    with SessionLocal() as db:
+                        any_post = db.execute(select(Post.id).where(Post.channel_id == db_ch.id).limit(1)).first()
+                    if not any_post:
+                        cursor = 0
+
+                # (message_id, text, date) as received; normalized after the fetch loop.
+                raw: list[tuple] = []
+
+                backfill_days = max(0, int(db_ch.backfill_days or 0))
+                backfill_since: datetime | None = None
+
+                if cursor <= 0 and backfill_days > 0:
+                    # First parse for a channel: backfill up to N days of history.
+                    # We bound the total amount to avoid infinite history walks.
+                    backfill_since = now - timedelta(days=backfill_days)
+                    msg_iter = client.iter_messages(entity, limit=2000)
+                elif cursor <= 0:
+                    # Default first parse when backfill is disabled.
+                    msg_iter = client.iter_messages(entity, limit=20)
+                else:
+                    # Incremental: fetch messages after the cursor.
+                    msg_iter = client.iter_messages(entity, min_id=cursor, reverse=True)
+
+                # Keep per-message work inside the async iteration minimal.
+                async for msg in msg_iter:
+                    msg_date = getattr(msg, "date", None)
+                    if backfill_since is not None:
+                        published_at = _to_utc(msg_date)
+                        if published_at is not None and published_at < backfill_since:
+                            # Backfill mode: stop once we reached older than the threshold.
+                            break
+                    raw.append((getattr(msg, "id", 0), getattr(msg, "message", None), msg_date))
+
+                with SessionLocal(expire_on_commit=False) as db:
+                    db.add(db_ch)
+
+                    # If entity exists, channel is accessible.
+                    if db_ch.access_status not in {ChannelAccessStatus.active, ChannelAccessStatus.joined}:
+                        db_ch.access_status = ChannelAccessStatus.joined
+
+                    channel_id = db_ch.id
+                    url_prefix = _message_url_prefix(ch=db_ch, entity=entity)
+                    normalized = ((int(mid or 0), _normalize_text(t), d) for mid, t, d in raw)
+                    rows = [
+                        {
+                            "channel_id": channel_id,
+                            "message_id": mid,
+                            "original_url": f"{url_prefix}{mid}" if url_prefix else "",
+                            "published_at": _to_utc(d) or now,
+                            "text": t,
+                            "created_at": now,
+                        }
+                        for mid, t, d in normalized
+                        if t and mid > cursor
+                    ]
+                    max_seen_id = max((r["message_id"] for r in rows), default=cursor)
+
+                    inserted = _insert_posts(db, rows)
+
+                    db_ch.cursor_message_id = max_seen_id if max_seen_id > cursor else cursor
+                    db_ch.last_error = ""
 
                     # Evidence for routing: this account successfully accessed the channel.
-                    upsert_membership(
-                        account_id=acc.id,
-                        channel_id=ch.id,
-                        status=AccountChannelStatus.joined,
-                        note="parsed_ok",
-                        now=now,
+                    # Same transaction as the posts/cursor write: one BEGIN/COMMIT for all of it.
+                    pending_upserts.append((acc.id, ch.id, AccountChannelStatus.joined, "parsed_ok"))
+                    upsert_memberships(pending_upserts, now=now, db=db)
+                    mark_account_used(account_id=acc.id, now=now, db=db)
+                    db.commit()
+                    pending_upserts.clear()
+
+                    inserted_total += inserted
+
+                    mode = "backfill" if cursor <= 0 and backfill_since is not None else "incremental"
+                    log.info(
+                        "parser: mode=%s channel=%s ident=%s cursor=%s->%s fetched=%s inserted=%s account_id=%s",
+                        mode,
+                        db_ch.id,
+                        db_ch.identifier,
+                        cursor,
+                        db_ch.cursor_message_id,
+                        len(rows),
+                        inserted,
+                        acc.id,
                     )
-                    mark_account_used(account_id=acc.id, now=now)
 
-                    parsed = True
-                    break
+                parsed = True
+                break
 
-            except TelethonConfigError as e:
-                log.warning("parser: telethon config error: %s", e)
-                return ParseSummary(
-                    channels_total=len(actionable_channels),
-                    channels_checked=checked,
-                    channels_skipped_no_account=0,
-                    posts_inserted=inserted_total,
-                )
-            except errors.FloodWaitError as e:
-                # Rate limit on this account. Persist cooldown and continue with other accounts.
-                last_exc = e
-                exclude.add(acc.id)
+        except TelethonConfigError:
+            upsert_memberships(pending_upserts, now=now)
+            raise
+        except errors.FloodWaitError as e:
+            # Rate limit on this account. Persist cooldown and continue with other accounts.
+            last_exc = e
+            exclude.add(acc.id)
+
+            seconds = int(getattr(e, "seconds", 0) or 0)
+            _mark_account_cooldown(
+                account_id=acc.id,
+                seconds=seconds,
+                note=f"FloodWait {seconds}s",
+                now=now,
+            )
 
-                seconds = int(getattr(e, "seconds", 0) or 0)
-                _mark_account_cooldown(
+            log.warning("parser: floodwait account_id=%s seconds=%s", acc.id, seconds)
+            continue
+        except (
+            errors.PhoneNumberBannedError,
+            errors.UserDeactivatedBanError,
+        ) as e:
+            # Account-level ban. Quarantine account and continue with others.
+            last_exc = e
+            exclude.add(acc.id)
+            _quarantine_account(account_id=acc.id, status=AccountStatus.banned, note=f"Banned: {e}", now=now)
+            log.warning("parser: quarantined banned account id=%s", acc.id)
+            msg = (
+                f"⚠️ TG Parser: аккаунт забанен/деактивирован. id={acc.id} phone={getattr(acc, 'phone_number', '') or ''} err={type(e).__name__}"
+            )
+            await notify_admin(msg)
+            await notify_team(msg)
+            continue
+        except (
+            errors.UserDeactivatedError,
+        ) as e:
+            # Restricted/forbidden account state (soft quarantine).
+            last_exc = e
+            exclude.add(acc.id)
+            _quarantine_account(account_id=acc.id, status=AccountStatus.forbidden, note=f"Forbidden: {e}", now=now)
+            log.warning("parser: quarantined forbidden account id=%s", acc.id)
+            msg = (
+                f"⚠️ TG Parser: аккаунт ограничен (forbidden). id={acc.id} phone={getattr(acc, 'phone_number', '') or ''}"
+            )
+            await notify_admin(msg)
+            await notify_team(msg)
+            continue
+        except errors.ChannelInvalidError as e:
+            # Channel itself is invalid: other accounts won't fare better this tick.
+            # Stop here; the channel is marked forbidden below.
+            last_exc = e
+            exclude.add(acc.id)
+            pending_upserts.append(
+                (acc.id, ch.id, AccountChannelStatus.forbidden, f"forbidden: {type(e).__name__}: {e}")
+            )
+            break
+        except (
+            errors.ChannelPrivateError,
+            errors.ChatAdminRequiredError,
+            errors.UserBannedInChannelError,
+            errors.UserNotParticipantError,
+            errors.ChatWriteForbiddenError,
+        ) as e:
+            # Channel-level forbidden for this account (CHANNEL_PRIVATE included: banned/removed
+            # from it or no access); mark membership forbidden and try other accounts.
+            last_exc = e
+            exclude.add(acc.id)
+            forbidden_hits += 1
+            pending_upserts.append(
+                (acc.id, ch.id, AccountChannelStatus.forbidden, f"forbidden: {type(e).__name__}: {e}")
+            )
+            continue
+        except errors.FloodError as e:
+            last_exc = e
+            exclude.add(acc.id)
+            if "FROZEN_METHOD_INVALID" in str(e):
+                _quarantine_account(
                     account_id=acc.id,
-                    seconds=seconds,
-                    note=f"FloodWait {seconds}s",
+                    status=AccountStatus.banned,
+                    note=f"Frozen: {e}",
                     now=now,
                 )
-
-                log.warning("parser: floodwait account_id=%s seconds=%s", acc.id, seconds)
-                continue
-            except (
-                errors.PhoneNumberBannedError,
-                errors.UserDeactivatedBanError,
-            ) as e:
-                # Account-level ban. Quarantine account and continue with others.
-                last_exc = e
-                exclude.add(acc.id)
-                _quarantine_account(account_id=acc.id, status=AccountStatus.banned, note=f"Banned: {e}", now=now)
-                log.warning("parser: quarantined banned account id=%s", acc.id)
-                msg = (
-                    f"⚠️ TG Parser: аккаунт забанен/деактивирован. id={acc.id} phone={getattr(acc, 'phone_number', '') or ''} err={type(e).__name__}"
-                )
-                await notify_admin(msg)
-                await notify_team(msg)
-                continue
-            except (
-                errors.UserDeactivatedError,
-            ) as e:
-                # Restricted/forbidden account state (soft quarantine).
-                last_exc = e
-                exclude.add(acc.id)
-                _quarantine_account(account_id=acc.id, status=AccountStatus.forbidden, note=f"Forbidden: {e}", now=now)
-                log.warning("parser: quarantined forbidden account id=%s", acc.id)
+                log.warning("parser: quarantined frozen account id=%s", acc.id)
                 msg = (
-                    f"⚠️ TG Parser: аккаунт ограничен (forbidden). id={acc.id} phone={getattr(acc, 'phone_number', '') or ''}"
+                    f"⚠️ TG Parser: аккаунт заморожен (FROZEN_METHOD_INVALID). id={acc.id} phone={getattr(acc, 'phone_number', '') or ''}"
                 )
                 await notify_admin(msg)
                 await notify_team(msg)
-                continue
-            except (
-                errors.ChannelPrivateError,
-                errors.ChatAdminRequiredError,
-                errors.UserBannedInChannelError,
-                errors.UserNotParticipantError,
-                errors.ChatWriteForbiddenError,
-            ) as e:
-                # Channel-level forbidden for this account; mark membership forbidden and try other accounts.
-                last_exc = e
-                exclude.add(acc.id)
-                upsert_membership(
-                    account_id=acc.id,
-                    channel_id=ch.id,
-                    status=AccountChannelStatus.forbidden,
-                    note=f"forbidden: {type(e).__name__}: {e}",
-                    now=now,
-                )
-                continue
-            except errors.FloodError as e:
-                last_exc = e
-                exclude.add(acc.id)
-                if "FROZEN_METHOD_INVALID" in str(e):
-                    _quarantine_account(
-                        account_id=acc.id,
-                        status=AccountStatus.banned,
-                        note=f"Frozen: {e}",
-                        now=now,
-                    )
-                    log.warning("parser: quarantined frozen account id=%s", acc.id)
-                    msg = (
-                        f"⚠️ TG Parser: аккаунт заморожен (FROZEN_METHOD_INVALID). id={acc.id} phone={getattr(acc, 'phone_number', '') or ''}"
-                    )
-                    await notify_admin(msg)
-                    await notify_team(msg)
-                continue
-            except Exception as e:
-                last_exc = e
-                exclude.add(acc.id)
-                continue
-
-        if not parsed:
-            forbidden_exc_types = (
-                errors.ChannelPrivateError,
-                errors.ChatAdminRequiredError,
-                errors.UserBannedInChannelError,
-                errors.UserNotParticipantError,
-                errors.ChatWriteForbiddenError,
+            continue
+        except (errors.RPCError, ConnectionError, asyncio.TimeoutError) as e:
+            # Telegram/network failure for this account: try the next one.
+            last_exc = e
+            exclude.add(acc.id)
+            continue
+        except Exception as e:
+            # Not account-related (DB, programming error, ...): retrying with other accounts
+            # would only burn Telegram calls. Abort this channel for the tick.
+            log.exception("parser: unexpected error channel_id=%s account_id=%s", ch.id, acc.id)
+            last_exc = e
+            break
+        finally:
+            busy_accounts.discard(acc.id)
+
+    upsert_memberships(pending_upserts, now=now)
+
+    if not parsed:
+        with SessionLocal() as db:
+            db.add(db_ch)
+            if isinstance(last_exc, errors.ChannelInvalidError) or (
+                accounts_tried and forbidden_hits == accounts_tried
+            ):
+                db_ch.access_status = ChannelAccessStatus.forbidden
+
+            db_ch.last_error = (
+                f"Resolve/access failed: {type(last_exc).__name__}: {last_exc}" if last_exc else "Resolve/access failed"
             )
+            db.commit()
 
-            with SessionLocal() as db:
-                db_ch = db.get(Channel, ch.id)
-                if db_ch:
-                    if isinstance(last_exc, forbidden_exc_types):
-                        db_ch.access_status = ChannelAccessStatus.forbidden
+        log.warning(
+            "parser: no eligible account for channel (id=%s last_err=%s)",
+            ch.id,
+            f"{type(last_exc).__name__}: {last_exc}" if last_exc else "<none>",
+        )
 
-                    db_ch.last_error = (
-                        f"Resolve/access failed: {type(last_exc).__name__}: {last_exc}" if last_exc else "Resolve/access failed"
-                    )
-                    db_ch.last_checked_at = now
-                    db.commit()
+    return inserted_total
 
-            log.warning(
-                "parser: no eligible account for channel (id=%s last_err=%s)",
-                ch.id,
-                f"{type(last_exc).__name__}: {last_exc}" if last_exc else "<none>",
-            )
-            continue
+
+async def parse_new_posts_once(
+    *,
+    now: datetime | None = None,
+    on_channel_done: Callable[[], Awaitable[None]] | None = None,
+) -> ParseSummary:
+    """Parse new posts for all active channels, incrementally.
+
+    on_channel_done is awaited after every channel (e.g. to extend the tick lock).
+    """
+
+    now = now or datetime.now(timezone.utc)
+
+    # v1 rule: we still *try* to ensure_joined before parsing.
+    # Hard skip only inactive channels and ones we already know are forbidden
+    # (backed by the partial index ix_channels_actionable).
+    with SessionLocal() as db:
+        actionable_channels = list(
+            db.execute(
+                select(Channel)
+                .where(
+                    Channel.is_active.is_(True),
+                    Channel.access_status != ChannelAccessStatus.forbidden,
+                )
+                .order_by(Channel.id.asc())
+            ).scalars()
+        )
+
+    summary = ParseSummary(channels_total=len(actionable_channels))
+
+    if not actionable_channels:
+        log.info("parser: no actionable channels")
+        return summary
+
+    # Accounts are selected per-channel (rotation + membership-aware).
+
+    checked = 0
+    # last_checked_at is written for all visited channels in one bulk UPDATE at the end.
+    checked_ids: list[int] = []
+
+    pool = get_shared_pool()
+
+    # Channels run concurrently (bounded); the pool still serializes work per account.
+    # Per-account amortization comes from the shared pool (client stays connected across
+    # channels and ticks) and the per-client dialogs index (one get_dialogs per account),
+    # so channels are not pre-grouped by account: that would funnel every channel onto the
+    # single LRU-first account and serialize the tick.
+    sem = asyncio.Semaphore(max(1, int(get_settings().tick_concurrency)))
+    busy_accounts: set[int] = set()
+    config_error = asyncio.Event()
+
+    async def _run(ch: Channel) -> int:
+        nonlocal checked
+        async with sem:
+            if config_error.is_set():
+                return 0
+            checked += 1
+            checked_ids.append(ch.id)
+            try:
+                return await _parse_channel(ch=ch, pool=pool, now=now, busy_accounts=busy_accounts)
+            except TelethonConfigError as e:
+                # Config issue is global; stop starting new channels.
+                if not config_error.is_set():
+                    log.warning("parser: telethon config error: %s", e)
+                config_error.set()
+                return 0
+            finally:
+                if on_channel_done is not None:
+                    await on_channel_done()
+
+    # return_exceptions: one channel's unexpected error must not leave its siblings running
+    # detached (past the tick lock / pool shutdown); wait for all, record progress, then raise.
+    results = await asyncio.gather(*(_run(ch) for ch in actionable_channels), return_exceptions=True)
+
+    _mark_channels_checked(channel_ids=checked_ids, now=now)
+
+    for res in results:
+        if isinstance(res, BaseException):
+            raise res
+    inserted_total = sum(results)
 
     return ParseSummary(
         channels_total=len(actionable_channels),
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -14,9 +16,23 @@ class Settings(BaseSettings):
     database_url: str
     redis_url: str = "redis://redis:6379/0"
 
+    # SQLAlchemy pool. Recycle must stay below any server/proxy idle timeout
+    # (Postgres idle_session_timeout, pgbouncer server_idle_timeout, cloud LB idle cutoffs);
+    # pre-ping still catches connections dropped earlier than that.
+    db_pool_size: int = 5
+    db_max_overflow: int = 5
+    db_pool_recycle_seconds: int = 1800
+
     tick_interval_seconds: int = 3600
     default_backfill_days: int = 0
 
+    # Parser: max channels processed concurrently per tick (distinct accounts run in parallel).
+    tick_concurrency: int = 4
+
+    # Parser: start the private-channel join concurrently with the dialogs lookup (off by default;
+    # a cancelled in-flight join leaves membership ambiguous until the next dialogs check).
+    speculative_join: bool = False
+
     # Telethon API credentials are stored per-account in DB (not in env).
 
     # Separate client token for the HTTP API (NOT the OpenClaw AGENT_SERVICE_TOKEN).
@@ -26,4 +42,8 @@ class Settings(BaseSettings):
     api_port: int = 8000
 
 
-settings = Settings()
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Process-wide settings; `.env` is parsed once. Tests can reset via `get_settings.cache_clear()`."""
+
+    return Settings()
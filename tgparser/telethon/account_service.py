@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
 
 from telethon.errors import FloodWaitError
 from telethon import errors
@@ -14,6 +15,10 @@ from ..db import SessionLocal
 from ..models import Account, AccountStatus
 from .session_storage import SessionStorage
 
+if TYPE_CHECKING:
+    # pool -> telethon_client -> account_service: annotation-only import avoids the cycle.
+    from .pool import TelethonClientPool
+
 log = logging.getLogger(__name__)
 
 
@@ -40,8 +45,11 @@ class AccountHealth:
 class TelethonAccountService:
     """Small service around Telethon client creation + account health checks."""
 
-    def __init__(self, *, session_storage: SessionStorage):
+    def __init__(self, *, session_storage: SessionStorage, pool: TelethonClientPool | None = None):
         self._storage = session_storage
+        # With a pool, checks borrow the account's pooled client: serialized with parser work on
+        # the same account (never two live connections on one auth key) and no extra connect.
+        self._pool = pool
 
     async def check(self, *, account_id: int) -> AccountHealth:
         """Check if the session is present and authorized.
@@ -53,17 +61,27 @@ class TelethonAccountService:
         - unexpected error => error
         """
 
-        sess_str = self._storage.get_session_string(account_id=account_id)
-        if not sess_str:
-            return AccountHealth(status=AccountStatus.auth_required, last_error="Missing session_string")
-
         with SessionLocal() as db:
             acc = db.execute(select(Account).where(Account.id == account_id)).scalar_one_or_none()
             if not acc:
                 return AccountHealth(status=AccountStatus.error, last_error=f"Account not found: {account_id}")
 
+        # Pass the loaded row so DB-backed storage doesn't SELECT the same account again.
+        sess_str = self._storage.get_session_string(account_id=account_id, account=acc)
+        if not sess_str:
+            return AccountHealth(status=AccountStatus.auth_required, last_error="Missing session_string")
+
         api_id, api_hash = _require_account_telethon_config(acc)
 
+        if self._pool is not None:
+            try:
+                async with self._pool.connected(account=acc) as client:
+                    return await self._probe(client)
+            except TelethonConfigError:
+                raise
+            except Exception as e:
+                return self._health_from_error(e)
+
         # Local import to keep worker start resilient if Telethon isn't installed.
         from telethon import TelegramClient
 
@@ -77,34 +95,42 @@ class TelethonAccountService:
 
         try:
             await client.connect()
-            if not await client.is_user_authorized():
-                return AccountHealth(
-                    status=AccountStatus.auth_required,
-                    last_error="Session is not authorized",
-                )
-
-            me = await client.get_me()
-            ident = getattr(me, "username", None) or getattr(me, "id", None) or "me"
-            return AccountHealth(status=AccountStatus.active, last_error=f"OK: {ident}")
-        except FloodWaitError as e:
+            return await self._probe(client)
+        except TelethonConfigError:
+            raise
+        except Exception as e:
+            return self._health_from_error(e)
+        finally:
+            try:
+                await client.disconnect()
+            except Exception:
+                log.exception("telethon: disconnect failed (account_id=%s)", account_id)
+
+    @staticmethod
+    async def _probe(client) -> AccountHealth:
+        if not await client.is_user_authorized():
+            return AccountHealth(
+                status=AccountStatus.auth_required,
+                last_error="Session is not authorized",
+            )
+
+        me = await client.get_me()
+        ident = getattr(me, "username", None) or getattr(me, "id", None) or "me"
+        return AccountHealth(status=AccountStatus.active, last_error=f"OK: {ident}")
+
+    @staticmethod
+    def _health_from_error(e: Exception) -> AccountHealth:
+        if isinstance(e, FloodWaitError):
             seconds = int(getattr(e, "seconds", 0) or 0)
             return AccountHealth(
                 status=AccountStatus.cooldown,
                 cooldown_until=datetime.now(timezone.utc) + timedelta(seconds=seconds),
                 last_error=f"FloodWait: {seconds}s",
             )
-        except errors.FloodError as e:
+        if isinstance(e, errors.FloodError):
             # Telegram may freeze accounts; this often manifests as FROZEN_METHOD_INVALID.
             msg = str(e)
             if "FROZEN_METHOD_INVALID" in msg:
                 return AccountHealth(status=AccountStatus.banned, last_error=f"Frozen: {msg}")
             return AccountHealth(status=AccountStatus.error, last_error=f"FloodError: {msg}")
-        except TelethonConfigError:
-            raise
-        except Exception as e:
-            return AccountHealth(status=AccountStatus.error, last_error=f"{type(e).__name__}: {e}")
-        finally:
-            try:
-                await client.disconnect()
-            except Exception:
-                log.exception("telethon: disconnect failed (account_id=%s)", account_id)
+        return AccountHealth(status=AccountStatus.error, last_error=f"{type(e).__name__}: {e}")
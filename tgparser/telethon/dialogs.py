@@ -1,12 +1,35 @@
 from __future__ import annotations
 
 import logging
+import time
+import weakref
+from dataclasses import dataclass
+from functools import lru_cache
 
 from ..models import Channel, ChannelType
 
 log = logging.getLogger(__name__)
 
 
+# Per-client dialogs index. Built from a single get_dialogs() call and reused while the client
+# object lives (the pool keeps one client per account, across ticks), so warm lookups are dict
+# hits with zero RPCs. A miss re-fetches dialogs (e.g. right after a join). Entries expire after
+# DIALOG_INDEX_TTL_SECONDS so a channel the account left/was kicked from stops being a hit.
+DIALOG_INDEX_TTL_SECONDS = 15 * 60
+
+
+@dataclass(slots=True)
+class _DialogIndex:
+    by_username: dict[str, object]
+    by_id: dict[int, object]
+    loaded_at: float
+
+
+_dialog_index: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+# Channel identifiers rarely change; memoize so per-tick lookups don't re-split strings.
+@lru_cache(maxsize=4096)
 def _norm_username(identifier: str) -> str:
     raw = (identifier or "").strip()
     if not raw:
@@ -17,32 +40,79 @@ def _norm_username(identifier: str) -> str:
     return raw.lstrip("@").strip().lower()
 
 
-async def get_entity_from_dialogs(*, client, ch: Channel, limit: int = 200):
-    """Find channel entity via dialogs.
+async def _load_dialog_index(*, client, limit: int) -> _DialogIndex:
+    dialogs = await client.get_dialogs(limit=limit)
 
-    This avoids resolve username / extra API calls once membership exists.
-    """
+    by_username: dict[str, object] = {}
+    by_id: dict[int, object] = {}
+    for d in dialogs:
+        ent = getattr(d, "entity", None)
+        u = (getattr(ent, "username", None) or "").strip().lower()
+        if u:
+            by_username.setdefault(u, ent)
+        ent_id = getattr(ent, "id", None)
+        if isinstance(ent_id, int) and ent_id:
+            by_id.setdefault(ent_id, ent)
+
+    index = _DialogIndex(by_username=by_username, by_id=by_id, loaded_at=time.monotonic())
+    _dialog_index[client] = index
+    return index
+
+
+def _fresh_index(client) -> _DialogIndex | None:
+    index = _dialog_index.get(client)
+    if index is None or time.monotonic() - index.loaded_at > DIALOG_INDEX_TTL_SECONDS:
+        return None
+    return index
 
-    dialogs = await client.get_dialogs(limit=limit)
 
+def _lookup(index: _DialogIndex, *, username: str, peer_id: int | None):
+    if username:
+        return index.by_username.get(username)
+    if peer_id:
+        return index.by_id.get(peer_id)
+    return None
+
+
+def _dialog_key(ch: Channel) -> tuple[str, int | None]:
+    username = ""
+    peer_id: int | None = None
     if ch.type == ChannelType.public:
         username = _norm_username(ch.identifier)
-        if not username:
-            return None
-        for d in dialogs:
-            ent = getattr(d, "entity", None)
-            u = (getattr(ent, "username", None) or "").strip().lower()
-            if u and u == username:
-                return ent
+    else:
+        # private: best-effort by numeric id if present on the object.
+        raw_peer_id = getattr(ch, "peer_id", None)
+        if isinstance(raw_peer_id, int) and raw_peer_id:
+            peer_id = raw_peer_id
+    return username, peer_id
+
+
+def get_cached_dialog_entity(*, client, ch: Channel):
+    """Look the channel up in the client's already-loaded dialogs index (never does an RPC)."""
+
+    index = _fresh_index(client)
+    if index is None:
         return None
+    username, peer_id = _dialog_key(ch)
+    return _lookup(index, username=username, peer_id=peer_id)
 
-    # private: best-effort by numeric id if present on the object.
-    peer_id = getattr(ch, "peer_id", None)
-    if isinstance(peer_id, int) and peer_id:
-        for d in dialogs:
-            ent = getattr(d, "entity", None)
-            ent_id = getattr(ent, "id", None)
-            if isinstance(ent_id, int) and ent_id == peer_id:
-                return ent
 
-    return None
+async def get_entity_from_dialogs(*, client, ch: Channel, limit: int = 200, refresh: bool = False):
+    """Find channel entity via dialogs.
+
+    This avoids resolve username / extra API calls once membership exists.
+    refresh=True bypasses the cached index (membership drift checks must see current dialogs).
+    """
+
+    username, peer_id = _dialog_key(ch)
+    if not username and not peer_id:
+        return None
+
+    index = None if refresh else _fresh_index(client)
+    if index is not None:
+        ent = _lookup(index, username=username, peer_id=peer_id)
+        if ent is not None:
+            return ent
+
+    index = await _load_dialog_index(client=client, limit=limit)
+    return _lookup(index, username=username, peer_id=peer_id)
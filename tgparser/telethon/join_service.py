@@ -1,20 +1,25 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import random
 import re
 from dataclasses import dataclass
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
 from telethon import errors
 from telethon.tl.functions.channels import JoinChannelRequest
 from telethon.tl.functions.messages import ImportChatInviteRequest
 
 from ..models import Channel, ChannelAccessStatus, ChannelType
+from .dialogs import get_cached_dialog_entity
 
 log = logging.getLogger(__name__)
 
 
-_INVITE_RE = re.compile(r"(?:https?://)?t\.me/\+(?P<hash>[A-Za-z0-9_-]+)")
+# Accepts: bare hash, +hash, t.me/+hash, t.me/joinchat/hash (optional scheme / leading slashes,
+# trailing path / query / fragment).
+_INVITE_RE = re.compile(r"^(?:https?://)?/*(?:t\.me/(?:\+|joinchat/)|\+)?(?P<hash>[A-Za-z0-9_-]+)(?:[/?#].*)?$")
 
 
 @dataclass(frozen=True)
@@ -26,28 +31,44 @@ class EnsureJoinedResult:
     access_status: ChannelAccessStatus | None = None
     # User-facing short note (safe to show in operator notifications).
     note: str = ""
+    # Set on FloodWait: the account should not be used for joins before this moment.
+    retry_after: datetime | None = None
 
 
-def _extract_invite_hash(invite_link_or_hash: str) -> str:
-    raw = (invite_link_or_hash or "").strip()
-    if not raw:
-        return ""
+# Transient errors (5xx, -503 timeouts, dropped connections) are retried in-call with capped
+# exponential backoff + jitter, so N accounts hitting the same blip don't retry in lockstep.
+# Everything else (invalid/expired invites, bans, FloodWait, ...) won't succeed on a retry and
+# goes straight to classification; FloodWait is surfaced via retry_after.
+_RETRY_ATTEMPTS = 3
+_RETRY_BASE_SECONDS = 0.5
+_RETRY_CAP_SECONDS = 5.0
+_TRANSIENT_ERRORS = (errors.ServerError, errors.TimedOutError, ConnectionError)
+
+
+async def _retry(op, *, attempts: int = _RETRY_ATTEMPTS):
+    for i in range(attempts):
+        try:
+            return await op()
+        except _TRANSIENT_ERRORS as e:
+            if i + 1 >= attempts:
+                raise
+            delay = min(_RETRY_CAP_SECONDS, _RETRY_BASE_SECONDS * 2**i) * random.uniform(0.5, 1.5)
+            log.info("ensure_joined retry %s/%s in %.2fs: %s", i + 1, attempts - 1, delay, type(e).__name__)
+            await asyncio.sleep(delay)
 
-    # Allow passing bare hash.
-    if "/" not in raw and raw[0] not in {"+"} and "t.me" not in raw:
-        return raw
 
-    m = _INVITE_RE.search(raw)
-    if m:
-        return m.group("hash")
+def _extract_invite_hash(invite_link_or_hash: str) -> str:
+    m = _INVITE_RE.match((invite_link_or_hash or "").strip())
+    return m.group("hash") if m else ""
+
 
-    # Fallback: t.me/+HASH but without scheme.
-    raw = raw.replace("https://", "").replace("http://", "")
-    raw = raw.lstrip("/")
-    if raw.startswith("t.me/+" ):
-        return raw.split("t.me/+", 1)[-1].split("/", 1)[0]
+def is_public_already_joined(ch: Channel) -> bool:
+    """Public channel already joined/active: joining again is a no-op, callers may skip the client."""
 
-    return ""
+    return ch.type == ChannelType.public and ch.access_status in {
+        ChannelAccessStatus.joined,
+        ChannelAccessStatus.active,
+    }
 
 
 async def ensure_joined(*, client, ch: Channel, force: bool = False) -> EnsureJoinedResult:
@@ -64,16 +85,12 @@ async def ensure_joined(*, client, ch: Channel, force: bool = False) -> EnsureJo
     # For *private* channels we must be able to call ImportChatInviteRequest even if the
     # channel was previously marked active/joined by some other account.
     # For *public* channels, a joined/active status is sufficient to skip re-joining.
-    if (
-        (not force)
-        and ch.type == ChannelType.public
-        and ch.access_status in {ChannelAccessStatus.joined, ChannelAccessStatus.active}
-    ):
+    if not force and is_public_already_joined(ch):
         return EnsureJoinedResult(ok=True, entity=None, access_status=ch.access_status)
 
     try:
         if ch.type == ChannelType.public:
-            # get_entity(@username) is acceptable for public; later parsing should use dialogs.
+            # Later parsing should use dialogs; here we only need an input peer to join.
             ref = (ch.identifier or "").strip()
             if not ref:
                 return EnsureJoinedResult(
@@ -82,14 +99,39 @@ async def ensure_joined(*, client, ch: Channel, force: bool = False) -> EnsureJo
                     note="empty public channel identifier",
                 )
 
+            # Already in this account's dialogs (loaded recently): member, no RPC needed.
+            # force=True (membership maintenance) always re-joins instead of trusting the cache.
+            known = None if force else get_cached_dialog_entity(client=client, ch=ch)
+            if known is not None:
+                return EnsureJoinedResult(
+                    ok=True,
+                    entity=known,
+                    access_status=ChannelAccessStatus.joined,
+                    note="already in dialogs",
+                )
+
             if not ref.startswith("@") and "t.me/" not in ref:
                 ref = "@" + ref.lstrip("@").strip()
 
-            entity = await client.get_entity(ref)
+            # Pass the username straight to the request: Telethon resolves it via get_input_entity,
+            # served from the session entity cache when the client already saw the channel.
+            # The full entity comes back in the JoinChannel updates instead of a separate get_entity.
+            entity = None
             try:
-                await client(JoinChannelRequest(entity))
+                updates = await _retry(lambda: client(JoinChannelRequest(ref)))
+                chats = getattr(updates, "chats", None)
+                if chats:
+                    entity = chats[0]
             except errors.UserAlreadyParticipantError:
                 pass
+            except (ValueError, TypeError) as e:
+                # Telethon resolves `ref` client-side: USERNAME_NOT_OCCUPIED surfaces as ValueError,
+                # a username that points at a user/bot (not a channel) as TypeError.
+                return EnsureJoinedResult(
+                    ok=False,
+                    access_status=ChannelAccessStatus.error,
+                    note=f"bad username: {type(e).__name__}",
+                )
 
             # Best-effort: return entity (may still not be in dialogs cache yet).
             return EnsureJoinedResult(
@@ -109,7 +151,7 @@ async def ensure_joined(*, client, ch: Channel, force: bool = False) -> EnsureJo
             )
 
         try:
-            res = await client(ImportChatInviteRequest(invite_hash))
+            res = await _retry(lambda: client(ImportChatInviteRequest(invite_hash)))
         except errors.UserAlreadyParticipantError:
             return EnsureJoinedResult(
                 ok=True,
@@ -139,11 +181,19 @@ async def ensure_joined(*, client, ch: Channel, force: bool = False) -> EnsureJo
             note="imported private invite",
         )
 
+    except (errors.UsernameNotOccupiedError, errors.UsernameInvalidError) as e:
+        return EnsureJoinedResult(ok=False, access_status=ChannelAccessStatus.error, note=f"bad username: {type(e).__name__}")
     except errors.ChatAdminRequiredError as e:
         log.info("ensure_joined forbidden: %s", e)
         return EnsureJoinedResult(ok=False, access_status=ChannelAccessStatus.forbidden, note="forbidden")
     except errors.FloodWaitError as e:
-        return EnsureJoinedResult(ok=False, access_status=ChannelAccessStatus.error, note=f"FloodWait {e.seconds}s")
+        seconds = int(getattr(e, "seconds", 0) or 0)
+        return EnsureJoinedResult(
+            ok=False,
+            access_status=ChannelAccessStatus.error,
+            note=f"FloodWait {seconds}s",
+            retry_after=now + timedelta(seconds=seconds),
+        )
     except errors.RPCError as e:
         return EnsureJoinedResult(ok=False, access_status=ChannelAccessStatus.error, note=f"RPCError: {type(e).__name__}")
     except Exception as e:
@@ -5,6 +5,7 @@ import logging
 import os
 import tempfile
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Any
 
 import socks
@@ -41,6 +42,9 @@ def generate_device_profile(*, app_version: str) -> TelethonDeviceProfile:
     )
 
 
+# Pure on the string; onboarding retries reuse the same proxy. Credential-bearing URLs are
+# only kept in this in-process cache (never persisted beyond accounts.proxy_url).
+@lru_cache(maxsize=64)
 def parse_proxy_url(proxy_url: str) -> tuple[Any, ...]:
     """Parse proxy url like: http://user:pass@ip:port
 
@@ -174,14 +178,16 @@ async def tdata_to_session_string(
     if not os.path.exists(abs_tdata):
         raise FileNotFoundError(f"tdata folder not found: {abs_tdata}")
 
-    api = API.TelegramDesktop.Generate()
-    api.api_id = profile.api_id
-    api.api_hash = profile.api_hash
-    api.device_model = profile.device_model
-    api.system_version = profile.system_version
-    api.app_version = profile.app_version
-    api.lang_code = profile.lang_code
-    api.system_lang_code = profile.system_lang_code
+    # Build directly from the profile: Generate() would randomize fields we overwrite anyway.
+    api = API.TelegramDesktop(
+        api_id=profile.api_id,
+        api_hash=profile.api_hash,
+        device_model=profile.device_model,
+        system_version=profile.system_version,
+        app_version=profile.app_version,
+        lang_code=profile.lang_code,
+        system_lang_code=profile.system_lang_code,
+    )
 
     proxy = parse_proxy_url(proxy_url) if proxy_url else None
 
@@ -204,11 +210,13 @@ async def tdata_to_session_string(
             return {"session_string": client.session.save(), "phone_number": phone}
         finally:
             try:
-                await client.disconnect()
+                # Shield: the outer timeout must not cancel the shutdown RPC halfway.
+                await asyncio.shield(client.disconnect())
             except Exception:
                 log.exception("telethon: disconnect failed (tdata_to_session_string)")
 
-    return await asyncio.wait_for(_run(), timeout=timeout_seconds)
+    async with asyncio.timeout(timeout_seconds):
+        return await _run()
 
 
 def prepare_tdata_upload_dir() -> str:
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
+import time
 from contextlib import asynccontextmanager
 from dataclasses import dataclass
 
@@ -13,55 +15,135 @@ from ..telethon_client import build_client
 log = logging.getLogger(__name__)
 
 
+DEFAULT_IDLE_TTL_SECONDS = 300
+DEFAULT_SWEEP_INTERVAL_SECONDS = 30
+
+
 @dataclass
 class _ClientEntry:
     client: TelegramClient
     lock: asyncio.Lock
+    # Session the client was built from; a changed session (re-auth) forces a rebuild.
+    session_string: str = ""
     refcount: int = 0
-    connected: bool = False
+    last_used_at: float = 0.0
 
 
 class TelethonClientPool:
     """Best-effort Telethon client pool.
 
     Purpose:
-    - Reuse client objects per Account during a single worker tick.
+    - Reuse connected client objects per Account across operations (and ticks), so the
+      MTProto handshake is paid once instead of on every borrow.
     - Serialize usage per account (Telethon client isn't safe for concurrent connects).
 
     Notes:
     - This pool is in-process only (no cross-worker sharing).
-    - We still disconnect when refcount drops to 0 to avoid leaking connections.
+    - Idle clients (refcount 0 for longer than idle_ttl) are disconnected by a background
+      sweeper; call close_all() on shutdown.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        *,
+        idle_ttl: float = DEFAULT_IDLE_TTL_SECONDS,
+        sweep_interval: float = DEFAULT_SWEEP_INTERVAL_SECONDS,
+    ) -> None:
         self._entries: dict[int, _ClientEntry] = {}
         self._global_lock = asyncio.Lock()
+        self._idle_ttl = idle_ttl
+        self._sweep_interval = sweep_interval
+        # Started lazily: __init__ may run outside of an event loop.
+        self._sweeper: asyncio.Task | None = None
 
     async def _get_entry(self, *, account: Account) -> _ClientEntry:
+        """Return the account's entry with refcount already bumped (caller must release)."""
+
         async with self._global_lock:
+            session_string = account.session_string or ""
             ent = self._entries.get(account.id)
+            if ent is not None and ent.session_string != session_string and ent.refcount == 0:
+                await self._disconnect(ent, account_id=account.id)
+                ent = None
             if ent is None:
-                ent = _ClientEntry(client=build_client(account=account), lock=asyncio.Lock())
+                ent = _ClientEntry(
+                    client=build_client(account=account),
+                    lock=asyncio.Lock(),
+                    session_string=session_string,
+                )
                 self._entries[account.id] = ent
+            # Counted under the global lock so the sweeper never drops an entry that is
+            # about to be borrowed.
+            ent.refcount += 1
+            if self._sweeper is None or self._sweeper.done():
+                self._sweeper = asyncio.create_task(self._sweep_idle())
             return ent
 
+    async def _disconnect(self, ent: _ClientEntry, *, account_id: int) -> None:
+        if not ent.client.is_connected():
+            return
+        try:
+            # Shield: a cancelled sweeper/caller must not abort the disconnect halfway.
+            await asyncio.shield(ent.client.disconnect())
+        except Exception:
+            log.exception("telethon_pool: disconnect failed (account_id=%s)", account_id)
+
+    async def _sweep_idle(self) -> None:
+        while True:
+            await asyncio.sleep(self._sweep_interval)
+            now = time.monotonic()
+            async with self._global_lock:
+                for account_id, ent in list(self._entries.items()):
+                    if ent.refcount:
+                        continue
+                    if now - ent.last_used_at < self._idle_ttl:
+                        continue
+                    await self._disconnect(ent, account_id=account_id)
+                    del self._entries[account_id]
+                if not self._entries:
+                    # Nothing left to watch; restarted on the next borrow.
+                    self._sweeper = None
+                    return
+
+    async def close_all(self) -> None:
+        """Disconnect every pooled client (graceful shutdown)."""
+
+        sweeper, self._sweeper = self._sweeper, None
+        if sweeper is not None and sweeper is not asyncio.current_task():
+            sweeper.cancel()
+            with contextlib.suppress(asyncio.CancelledError, Exception):
+                await sweeper
+
+        async with self._global_lock:
+            entries, self._entries = self._entries, {}
+        for account_id, ent in entries.items():
+            async with ent.lock:
+                await self._disconnect(ent, account_id=account_id)
+
     @asynccontextmanager
     async def connected(self, *, account: Account):
         ent = await self._get_entry(account=account)
 
-        async with ent.lock:
-            ent.refcount += 1
-            try:
-                if not ent.connected:
+        try:
+            async with ent.lock:
+                # Ask the client, not a cached flag: after a network drop Telethon gives up
+                # reconnecting (connection_retries=1) and the pooled client stays disconnected.
+                if not ent.client.is_connected():
                     await ent.client.connect()
-                    ent.connected = True
                 yield ent.client
-            finally:
-                ent.refcount = max(0, ent.refcount - 1)
-                if ent.refcount == 0 and ent.connected:
-                    try:
-                        await ent.client.disconnect()
-                    except Exception:
-                        log.exception("telethon_pool: disconnect failed (account_id=%s)", account.id)
-                    finally:
-                        ent.connected = False
+        finally:
+            # Keep the client connected; the idle sweeper disconnects it later.
+            ent.refcount = max(0, ent.refcount - 1)
+            ent.last_used_at = time.monotonic()
+
+
+_shared_pool: TelethonClientPool | None = None
+
+
+def get_shared_pool() -> TelethonClientPool:
+    """Process-wide pool so connected clients survive between ticks/handlers."""
+
+    global _shared_pool
+    if _shared_pool is None:
+        _shared_pool = TelethonClientPool()
+    return _shared_pool
@@ -1,10 +1,13 @@
 from __future__ import annotations
 
 import logging
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 
-from sqlalchemy import and_, case, or_, select
+from sqlalchemy import and_, case, func, literal_column, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
 
 from ..db import SessionLocal
 from ..models import (
@@ -25,16 +28,38 @@ class PickResult:
     reason: str
 
 
+@contextmanager
+def _session(db: Session | None, *, commit: bool = False):
+    """Reuse the caller's session (caller owns the transaction) or open + commit our own."""
+
+    if db is not None:
+        yield db
+        return
+    with SessionLocal() as own:
+        yield own
+        if commit:
+            own.commit()
+
+
 def _is_ready_account_clause(*, now: datetime):
+    # The static part repeats ix_accounts_lru_ready's predicate as literals, not bind params:
+    # under generic (prepared) plans Postgres can only match a partial index predicate it sees
+    # verbatim.
     return and_(
-        Account.is_active.is_(True),
-        Account.status == AccountStatus.active,
+        Account.is_active,
+        Account.status == literal_column(f"'{AccountStatus.active.value}'"),
+        Account.session_string != literal_column("''"),
         or_(Account.cooldown_until.is_(None), Account.cooldown_until <= now),
-        Account.session_string != "",
     )
 
 
-def pick_account_for_channel(*, ch: Channel, exclude_account_ids: set[int] | None = None) -> PickResult:
+def pick_account_for_channel(
+    *,
+    ch: Channel,
+    exclude_account_ids: set[int] | None = None,
+    now: datetime | None = None,
+    db: Session | None = None,
+) -> PickResult:
     """Pick best account candidate for channel.
 
     Policy (v1):
@@ -42,51 +67,52 @@ def pick_account_for_channel(*, ch: Channel, exclude_account_ids: set[int] | Non
     - Prefer already joined accounts for private channels.
     - LRU: order by last_used_at ASC (NULLs first), then account.id.
 
+    Indexes: for public channels ix_accounts_lru_ready (partial, ready accounts in LRU order)
+    serves the ORDER BY without a sort. Private channels add the joined-first key and sort
+    the candidates; ix_acm_channel_status covers their membership LEFT JOIN.
+
     Returns only ONE account. Caller can retry with different policy if needed.
     """
 
-    now = datetime.now(timezone.utc)
+    # Callers pass the tick's `now` so one tick sees a consistent cooldown snapshot.
+    now = now or datetime.now(timezone.utc)
 
     exclude_account_ids = exclude_account_ids or set()
 
-    with SessionLocal() as db:
-        base = select(Account).where(_is_ready_account_clause(now=now))
-        if exclude_account_ids:
-            base = base.where(Account.id.notin_(exclude_account_ids))
+    base = select(Account).where(_is_ready_account_clause(now=now))
+    if exclude_account_ids:
+        base = base.where(Account.id.notin_(exclude_account_ids))
 
-        # For private channels, prefer joined memberships, but allow unknown to attempt join.
-        if ch.type == ChannelType.private:
-            m = AccountChannelMembership
+    # For private channels, prefer joined memberships, but allow unknown to attempt join.
+    if ch.type == ChannelType.private:
+        m = AccountChannelMembership
 
-            # LEFT JOIN membership for this channel.
-            base = base.outerjoin(m, and_(m.account_id == Account.id, m.channel_id == ch.id))
+        # LEFT JOIN membership for this channel.
+        base = base.outerjoin(m, and_(m.account_id == Account.id, m.channel_id == ch.id))
 
-            # Exclude forbidden memberships.
-            base = base.where(or_(m.id.is_(None), m.status != AccountChannelStatus.forbidden))
+        # Exclude forbidden memberships.
+        base = base.where(or_(m.id.is_(None), m.status != AccountChannelStatus.forbidden))
 
-            # Sort key: joined first, then pending/join_requested/unknown/error.
-            joined_first = case((m.status == AccountChannelStatus.joined, 0), else_=1)
-            base = base.order_by(joined_first.asc())
+        # Sort key: joined first, then pending/join_requested/unknown/error.
+        joined_first = case((m.status == AccountChannelStatus.joined, 0), else_=1)
+        base = base.order_by(joined_first.asc())
 
-        # LRU rotation.
-        base = base.order_by(Account.last_used_at.asc().nullsfirst(), Account.id.asc())
+    # LRU rotation.
+    base = base.order_by(Account.last_used_at.asc().nullsfirst(), Account.id.asc())
 
-        acc = db.execute(base.limit(1)).scalars().first()
-        if not acc:
-            return PickResult(account=None, reason="no_ready_accounts")
+    with _session(db) as s:
+        acc = s.execute(base.limit(1)).scalars().first()
+    if not acc:
+        return PickResult(account=None, reason="no_ready_accounts")
 
-        return PickResult(account=acc, reason="picked")
+    return PickResult(account=acc, reason="picked")
 
 
-def mark_account_used(*, account_id: int, now: datetime | None = None) -> None:
+def mark_account_used(*, account_id: int, now: datetime | None = None, db: Session | None = None) -> None:
     now = now or datetime.now(timezone.utc)
-    with SessionLocal() as db:
-        acc = db.get(Account, account_id)
-        if not acc:
-            return
-        acc.last_used_at = now
-        acc.updated_at = now
-        db.commit()
+    # Single UPDATE; a vanished account just affects 0 rows.
+    with _session(db, commit=True) as s:
+        s.execute(update(Account).where(Account.id == account_id).values(last_used_at=now, updated_at=now))
 
 
 def upsert_membership(
@@ -96,33 +122,67 @@ def upsert_membership(
     status: AccountChannelStatus,
     note: str = "",
     now: datetime | None = None,
+    db: Session | None = None,
 ) -> None:
+    """Upsert one (account, channel) membership in a single INSERT .. ON CONFLICT statement."""
+
+    upsert_memberships([(account_id, channel_id, status, note)], now=now, db=db)
+
+
+def upsert_memberships(
+    items: list[tuple[int, int, AccountChannelStatus, str]],
+    *,
+    now: datetime | None = None,
+    db: Session | None = None,
+) -> None:
+    """Upsert memberships in one INSERT .. ON CONFLICT DO UPDATE.
+
+    items: (account_id, channel_id, status, note). If the same pair appears more than
+    once, the last entry wins. First-set timestamps (joined_at etc.) are preserved.
+    """
+
+    if not items:
+        return
+
     now = now or datetime.now(timezone.utc)
 
-    with SessionLocal() as db:
-        existing = db.execute(
-            select(AccountChannelMembership).where(
-                AccountChannelMembership.account_id == account_id,
-                AccountChannelMembership.channel_id == channel_id,
-            )
-        ).scalars().first()
-
-        if existing is None:
-            existing = AccountChannelMembership(account_id=account_id, channel_id=channel_id)
-            db.add(existing)
-
-        existing.status = status
-        existing.note = (note or "")[:5000]
-        existing.last_checked_at = now
-        existing.updated_at = now
-
-        if status == AccountChannelStatus.join_requested:
-            existing.join_requested_at = existing.join_requested_at or now
-        if status == AccountChannelStatus.pending_approval:
-            existing.join_requested_at = existing.join_requested_at or now
-        if status == AccountChannelStatus.joined:
-            existing.joined_at = existing.joined_at or now
-        if status == AccountChannelStatus.forbidden:
-            existing.forbidden_at = existing.forbidden_at or now
-
-        db.commit()
+    latest: dict[tuple[int, int], tuple[AccountChannelStatus, str]] = {}
+    for account_id, channel_id, status, note in items:
+        latest[(account_id, channel_id)] = (status, note)
+
+    rows = [
+        {
+            "account_id": account_id,
+            "channel_id": channel_id,
+            "status": status,
+            "note": (note or "")[:5000],
+            "last_checked_at": now,
+            "updated_at": now,
+            "join_requested_at": (
+                now
+                if status in {AccountChannelStatus.join_requested, AccountChannelStatus.pending_approval}
+                else None
+            ),
+            "joined_at": now if status == AccountChannelStatus.joined else None,
+            "forbidden_at": now if status == AccountChannelStatus.forbidden else None,
+        }
+        for (account_id, channel_id), (status, note) in latest.items()
+    ]
+
+    m = AccountChannelMembership
+    stmt = pg_insert(m).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[m.account_id, m.channel_id],
+        set_={
+            "status": stmt.excluded.status,
+            "note": stmt.excluded.note,
+            "last_checked_at": stmt.excluded.last_checked_at,
+            "updated_at": stmt.excluded.updated_at,
+            "join_requested_at": func.coalesce(m.join_requested_at, stmt.excluded.join_requested_at),
+            "joined_at": func.coalesce(m.joined_at, stmt.excluded.joined_at),
+            "forbidden_at": func.coalesce(m.forbidden_at, stmt.excluded.forbidden_at),
+        },
+    )
+
+    with _session(db, commit=True) as s:
+        s.execute(stmt)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 
 from ..db import SessionLocal
 from ..models import Account
@@ -23,7 +23,8 @@ class SessionStorage:
     - reuse in onboarding flows (phone-code/tdata)
     """
 
-    def get_session_string(self, *, account_id: int) -> str:  # pragma: no cover (interface)
+    def get_session_string(self, *, account_id: int, account: Account | None = None) -> str:  # pragma: no cover (interface)
+        """`account`: already-loaded row; backends keyed on it may skip their own lookup."""
         raise NotImplementedError
 
     def set_session_string(self, *, account_id: int, session_string: str) -> None:  # pragma: no cover
@@ -37,20 +38,28 @@ class SessionStorage:
 class DbSessionStorage(SessionStorage):
     """DB-backed storage using the accounts.session_string field."""
 
-    def get_session_string(self, *, account_id: int) -> str:
+    def get_session_string(self, *, account_id: int, account: Account | None = None) -> str:
+        # The session lives on the account row: reuse it when the caller already has it.
+        if account is not None and account.id == account_id:
+            return (account.session_string or "").strip()
+        # Only the one column: no ORM hydration for a read-only lookup.
         with SessionLocal() as db:
-            acc = db.execute(select(Account).where(Account.id == account_id)).scalar_one_or_none()
-            if not acc:
+            row = db.execute(select(Account.session_string).where(Account.id == account_id)).first()
+            if row is None:
                 raise SessionStorageError(f"Account not found: {account_id}")
-            return (acc.session_string or "").strip()
+            return (row[0] or "").strip()
 
     def set_session_string(self, *, account_id: int, session_string: str) -> None:
         session_string = (session_string or "").strip()
         with SessionLocal() as db:
-            acc = db.execute(select(Account).where(Account.id == account_id)).scalar_one_or_none()
-            if not acc:
+            updated = db.execute(
+                update(Account)
+                .where(Account.id == account_id)
+                .values(session_string=session_string)
+                .returning(Account.id)
+            ).first()
+            if updated is None:
                 raise SessionStorageError(f"Account not found: {account_id}")
-            acc.session_string = session_string
             db.commit()
 
     def clear_session_string(self, *, account_id: int) -> None:
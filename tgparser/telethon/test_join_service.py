@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import asyncio
+import unittest
+
+from tgparser.models import Channel, ChannelAccessStatus, ChannelType
+from tgparser.telethon.join_service import _extract_invite_hash, ensure_joined
+
+
+class TestExtractInviteHash(unittest.TestCase):
+    def test_bare_hash(self) -> None:
+        self.assertEqual(_extract_invite_hash("AbC_d-1"), "AbC_d-1")
+        self.assertEqual(_extract_invite_hash("+AbC_d-1"), "AbC_d-1")
+
+    def test_plus_link(self) -> None:
+        self.assertEqual(_extract_invite_hash("https://t.me/+abc"), "abc")
+        self.assertEqual(_extract_invite_hash("t.me/+abc"), "abc")
+
+    def test_joinchat_link(self) -> None:
+        self.assertEqual(_extract_invite_hash("https://t.me/joinchat/abc"), "abc")
+        self.assertEqual(_extract_invite_hash("  //t.me/joinchat/abc/  "), "abc")
+
+    def test_query_and_fragment_suffixes(self) -> None:
+        self.assertEqual(_extract_invite_hash("https://t.me/+abc?x=1"), "abc")
+        self.assertEqual(_extract_invite_hash("https://t.me/+abc#frag"), "abc")
+        self.assertEqual(_extract_invite_hash("https://t.me/joinchat/abc/?x=1#f"), "abc")
+
+    def test_invalid(self) -> None:
+        self.assertEqual(_extract_invite_hash(""), "")
+        self.assertEqual(_extract_invite_hash("https://t.me/+"), "")
+
+
+class _RaisingClient:
+    def __init__(self, exc: Exception) -> None:
+        self.exc = exc
+
+    async def __call__(self, request):
+        raise self.exc
+
+
+class TestEnsureJoinedBadUsername(unittest.TestCase):
+    def _join(self, exc: Exception):
+        ch = Channel(
+            id=1,
+            type=ChannelType.public,
+            identifier="nosuchchannel",
+            access_status=ChannelAccessStatus.error,
+        )
+        return asyncio.run(ensure_joined(client=_RaisingClient(exc), ch=ch))
+
+    def test_unresolvable_username(self) -> None:
+        res = self._join(ValueError('No user has "nosuchchannel" as username'))
+        self.assertFalse(res.ok)
+        self.assertEqual(res.access_status, ChannelAccessStatus.error)
+        self.assertEqual(res.note, "bad username: ValueError")
+
+    def test_non_channel_peer(self) -> None:
+        res = self._join(TypeError("Cannot cast InputPeerUser to any kind of InputChannel."))
+        self.assertEqual(res.note, "bad username: TypeError")
+
+
+if __name__ == "__main__":
+    unittest.main()
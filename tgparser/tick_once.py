@@ -6,29 +6,44 @@ import logging
 
 import redis.asyncio as redis
 
-from .settings import settings
-from .worker import acquire_lock, release_lock, tick
+from .settings import get_settings
+from .telethon.pool import get_shared_pool
+from .worker import TICK_SEQ_KEY, acquire_lock, queue_release_lock, tick
+
+log = logging.getLogger(__name__)
 
 
 async def _run_once(*, force: bool) -> int:
     logging.basicConfig(level=logging.INFO)
-    r = redis.from_url(settings.redis_url)
+    r = redis.from_url(get_settings().redis_url)
 
     token = None
+    tick_id: int | None = None
     if not force:
-        token = await acquire_lock(r)
-        if not token:
-            logging.getLogger(__name__).info("tick_once: skipped (lock held)")
+        acquired = await acquire_lock(r)
+        if not acquired:
+            log.info("tick_once: skipped (lock held)")
             return 2
+        token, tick_id = acquired
 
+    # End-of-tick writes (tick meta + lock release) go out in one round-trip.
+    pipe = r.pipeline(transaction=False)
     try:
-        tick_id = int(await r.incr("tgparser:tick:seq"))
-        await tick(r, tick_id=tick_id)
+        if tick_id is None:
+            # --force: no lock, so the sequence wasn't allocated by the acquire script.
+            tick_id = int(await r.incr(TICK_SEQ_KEY))
+        await tick(r, tick_id=tick_id, pipe=pipe, lock_token=token)
         return 0
     finally:
         try:
+            # Pooled Telethon clients stay connected between uses; close them before exit.
+            await get_shared_pool().close_all()
             if token:
-                await release_lock(r, token=token)
+                queue_release_lock(pipe, token=token)
+            try:
+                await pipe.execute()
+            except Exception:
+                log.exception("tick_once: final redis writes failed")
         finally:
             # Avoid "Event loop is closed" warnings on interpreter shutdown.
             try:
@@ -2,24 +2,23 @@ from __future__ import annotations
 
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from .db import SessionLocal
 from .models import BotUser
 
 
-def track_user(telegram_user_id: int) -> None:
+def track_user(telegram_user_id: int, *, now: datetime | None = None) -> None:
     """Upsert user into bot_users (sync; safe to call from handlers)."""
 
-    now = datetime.now(timezone.utc)
-    with SessionLocal() as db:
-        existing = db.execute(
-            select(BotUser).where(BotUser.telegram_user_id == int(telegram_user_id))
-        ).scalar_one_or_none()
-
-        if existing:
-            existing.last_seen_at = now
-        else:
-            db.add(BotUser(telegram_user_id=int(telegram_user_id), first_seen_at=now, last_seen_at=now))
+    now = now or datetime.now(timezone.utc)
+    stmt = pg_insert(BotUser).values(telegram_user_id=int(telegram_user_id), first_seen_at=now, last_seen_at=now)
+    # One round-trip; first_seen_at is kept from the original row.
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[BotUser.telegram_user_id],
+        set_={"last_seen_at": stmt.excluded.last_seen_at},
+    )
 
+    with SessionLocal() as db:
+        db.execute(stmt)
         db.commit()
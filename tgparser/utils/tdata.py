@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import os
 import shutil
+import struct
 import zipfile
 
 
@@ -9,10 +10,66 @@ class TdataArchiveError(RuntimeError):
     pass
 
 
-def _safe_extract_zip(*, z: zipfile.ZipFile, dst_dir: str) -> None:
-    """Extract zip contents into dst_dir preventing Zip Slip path traversal."""
+# tdata members (key_datas, map files) can be MBs; a 1 MiB buffer cuts read()/write() calls.
+_COPY_BUFSIZE = 1 << 20
+
+# Local file header: fixed 30 bytes; name/extra lengths at offset 26 (they may differ from the
+# central directory copy, so the data offset must come from the local header itself).
+_LOCAL_HEADER_SIZE = 30
+_LOCAL_HEADER_SIGNATURE = b"PK\x03\x04"
+
+
+def _copy_stored_member(*, z: zipfile.ZipFile, member: zipfile.ZipInfo, dst_fd: int) -> bool:
+    """Kernel-side copy of an uncompressed member via copy_file_range (Linux).
+
+    Returns False when the fast path doesn't apply; caller falls back to a buffered copy.
+    Note: skips zipfile's CRC check (same trust level as the rest of the upload).
+    """
+
+    if not hasattr(os, "copy_file_range"):
+        return False
+    if member.compress_type != zipfile.ZIP_STORED or member.flag_bits & 0x1:  # encrypted
+        return False
+
+    try:
+        src_fd = z.fp.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+
+    header = os.pread(src_fd, _LOCAL_HEADER_SIZE, member.header_offset)
+    if len(header) != _LOCAL_HEADER_SIZE or header[:4] != _LOCAL_HEADER_SIGNATURE:
+        return False
+    name_len, extra_len = struct.unpack("<HH", header[26:30])
+    offset = member.header_offset + _LOCAL_HEADER_SIZE + name_len + extra_len
+
+    remaining = member.file_size
+    try:
+        while remaining:
+            n = os.copy_file_range(src_fd, dst_fd, remaining, offset)
+            if n == 0:
+                break
+            offset += n
+            remaining -= n
+    except OSError:
+        # e.g. unsupported filesystem pair; restart the member with the buffered copy.
+        os.ftruncate(dst_fd, 0)
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        return False
+
+    if remaining:
+        raise TdataArchiveError("truncated archive member")
+    return True
+
+
+def _safe_extract_zip(*, z: zipfile.ZipFile, dst_dir: str) -> str | None:
+    """Extract zip contents into dst_dir preventing Zip Slip path traversal.
+
+    Returns the shallowest relative path of a 'tdata' folder seen while extracting (or None).
+    """
 
     dst_dir_abs = os.path.abspath(dst_dir)
+    tdata_rel: str | None = None
+    tdata_depth = 0
 
     for member in z.infolist():
         # Skip directory entries; they'll be created implicitly.
@@ -30,15 +87,29 @@ def _safe_extract_zip(*, z: zipfile.ZipFile, dst_dir: str) -> None:
         if not out_path.startswith(dst_dir_abs + os.sep) and out_path != dst_dir_abs:
             raise TdataArchiveError("unsafe archive paths detected")
 
-        # Ensure parent dir exists.
-        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+        # Locate tdata/ while extracting instead of walking the tree afterwards.
+        parts = normalized.split(os.sep)
+        if "tdata" in parts:
+            idx = parts.index("tdata")
+            # A plain file named 'tdata' is not the folder.
+            if (idx + 1 < len(parts) or member.is_dir()) and (tdata_rel is None or idx + 1 < tdata_depth):
+                tdata_depth = idx + 1
+                tdata_rel = os.path.join(*parts[:tdata_depth])
 
         if member.is_dir():
             os.makedirs(out_path, exist_ok=True)
             continue
 
-        with z.open(member) as src, open(out_path, "wb") as dst:
-            shutil.copyfileobj(src, dst)
+        # Ensure parent dir exists.
+        os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+        with open(out_path, "wb") as dst:
+            if _copy_stored_member(z=z, member=member, dst_fd=dst.fileno()):
+                continue
+            with z.open(member) as src:
+                shutil.copyfileobj(src, dst, _COPY_BUFSIZE)
+
+    return tdata_rel
 
 
 def extract_tdata_from_archive(*, archive_path: str, extract_root: str) -> str:
@@ -61,21 +132,11 @@ def extract_tdata_from_archive(*, archive_path: str, extract_root: str) -> str:
     os.makedirs(extract_root, exist_ok=True)
 
     with zipfile.ZipFile(archive_path) as z:
-        _safe_extract_zip(z=z, dst_dir=extract_root)
-
-    # Find tdata folder
-    candidate = os.path.join(extract_root, "tdata")
-    if os.path.isdir(candidate):
-        tdata_dir = candidate
-    else:
-        tdata_dir = ""
-        for root, dirs, _files in os.walk(extract_root):
-            if "tdata" in dirs:
-                tdata_dir = os.path.join(root, "tdata")
-                break
+        tdata_rel = _safe_extract_zip(z=z, dst_dir=extract_root)
 
-        if not tdata_dir:
-            raise TdataArchiveError("tdata folder not found in archive")
+    if not tdata_rel:
+        raise TdataArchiveError("tdata folder not found in archive")
+    tdata_dir = os.path.join(extract_root, tdata_rel)
 
     # Basic sanity: not empty (common user mistake: zip wrong folder level)
     try:
@@ -1,13 +1,25 @@
 from __future__ import annotations
 
 import os
+import struct
 import tempfile
 import unittest
 import zipfile
+from unittest import mock
 
 from tgparser.utils.tdata import TdataArchiveError, extract_tdata_from_archive
 
 
+def _write_mixed_archive(archive: str, *, stored: bytes, deflated: bytes) -> None:
+    with zipfile.ZipFile(archive, "w") as z:
+        info = zipfile.ZipInfo("tdata/key_datas")
+        info.compress_type = zipfile.ZIP_STORED
+        # Non-empty extra field: the data offset must account for it.
+        info.extra = struct.pack("<HH", 0xCAFE, 4) + b"abcd"
+        z.writestr(info, stored)
+        z.writestr("tdata/D877F783D5D3EF8C/maps", deflated, compress_type=zipfile.ZIP_DEFLATED)
+
+
 class TestExtractTdataFromArchive(unittest.TestCase):
     def test_extract_root_level_tdata(self) -> None:
         with tempfile.TemporaryDirectory() as td:
@@ -32,6 +44,44 @@ class TestExtractTdataFromArchive(unittest.TestCase):
             tdata_dir = extract_tdata_from_archive(archive_path=archive, extract_root=extract_root)
             self.assertTrue(tdata_dir.endswith(os.path.join("Desktop", "tdata")))
 
+    def test_prefers_shallowest_tdata(self) -> None:
+        with tempfile.TemporaryDirectory() as td:
+            archive = os.path.join(td, "tdata.zip")
+            extract_root = os.path.join(td, "out")
+
+            with zipfile.ZipFile(archive, "w") as z:
+                z.writestr("backup/old/tdata/key_datas", b"old")
+                z.writestr("tdata/key_datas", b"abc")
+
+            tdata_dir = extract_tdata_from_archive(archive_path=archive, extract_root=extract_root)
+            self.assertEqual(tdata_dir, os.path.join(extract_root, "tdata"))
+
+    def test_extracted_contents_match(self) -> None:
+        stored = os.urandom(300_000)
+        deflated = b"map" * 50_000
+        with tempfile.TemporaryDirectory() as td:
+            archive = os.path.join(td, "tdata.zip")
+            extract_root = os.path.join(td, "out")
+            _write_mixed_archive(archive, stored=stored, deflated=deflated)
+
+            tdata_dir = extract_tdata_from_archive(archive_path=archive, extract_root=extract_root)
+            with open(os.path.join(tdata_dir, "key_datas"), "rb") as f:
+                self.assertEqual(f.read(), stored)
+            with open(os.path.join(tdata_dir, "D877F783D5D3EF8C", "maps"), "rb") as f:
+                self.assertEqual(f.read(), deflated)
+
+    def test_stored_member_falls_back_to_buffered_copy(self) -> None:
+        stored = os.urandom(300_000)
+        with tempfile.TemporaryDirectory() as td:
+            archive = os.path.join(td, "tdata.zip")
+            extract_root = os.path.join(td, "out")
+            _write_mixed_archive(archive, stored=stored, deflated=b"x")
+
+            with mock.patch.object(os, "copy_file_range", side_effect=OSError("EXDEV"), create=True):
+                tdata_dir = extract_tdata_from_archive(archive_path=archive, extract_root=extract_root)
+            with open(os.path.join(tdata_dir, "key_datas"), "rb") as f:
+                self.assertEqual(f.read(), stored)
+
     def test_reject_path_traversal(self) -> None:
         with tempfile.TemporaryDirectory() as td:
             archive = os.path.join(td, "evil.zip")
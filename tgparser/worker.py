@@ -1,36 +1,54 @@
 from __future__ import annotations
 
 import asyncio
-import contextlib
+import functools
+import json
 import logging
-from dataclasses import dataclass, replace
+from dataclasses import asdict, dataclass, replace
 from datetime import datetime, timezone
 import secrets
+import time
 
 import redis.asyncio as redis
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
 
 from .db import SessionLocal
 from .models import Account, AccountStatus
-from .settings import settings
+from .settings import get_settings
 from .telethon.account_service import TelethonAccountService, TelethonConfigError
 from .telethon.session_storage import DbSessionStorage
 from .notify import notify_admin, notify_team
 from .membership_maintenance import ensure_membership_once
-from .parser_engine import parse_new_posts_once
+from .parser_engine import ParseSummary, parse_new_posts_once
+from .telethon.pool import get_shared_pool
 
 log = logging.getLogger(__name__)
 
 
 LOCK_KEY = "tgparser:tick:lock"
 # TTL should cover the whole tick even if it runs long, otherwise another worker could
-# acquire the lock after expiry and overlap.
-# Keep a sane minimum (55m) but also tie it to the configured interval.
-LOCK_TTL_SECONDS = max(60 * 55, settings.tick_interval_seconds + 300)
+# acquire the lock after expiry and overlap. Keep a sane minimum (55m) but also tie it to
+# the configured interval (2x); tick() renews it at work boundaries and per parsed channel.
+LOCK_TTL_SECONDS = max(60 * 55, get_settings().tick_interval_seconds * 2)
 
 TICK_SEQ_KEY = "tgparser:tick:seq"
-LAST_TICK_KEY = "tgparser:tick:last"  # Redis hash
+LAST_TICK_KEY = "tgparser:tick:last"  # Redis string: compact JSON object
+# Tick meta is only a status snapshot: it expires after a few missed ticks, so a missing key
+# in /status also means "no worker has ticked lately".
+LAST_TICK_TTL_SECONDS = max(600, get_settings().tick_interval_seconds * 3)
 
+# Health checks load, probe and commit accounts in keyset pages of this size.
+ACCOUNTS_PAGE_SIZE = 100
+
+
+# SET NX EX + INCR of the tick sequence in one round-trip; nil when the lock is held.
+_ACQUIRE_LOCK_LUA = """
+if redis.call('SET', KEYS[1], ARGV[1], 'NX', 'EX', ARGV[2]) then
+  return redis.call('INCR', KEYS[2])
+else
+  return false
+end
+"""
 
 _RELEASE_LOCK_LUA = """
 if redis.call('GET', KEYS[1]) == ARGV[1] then
@@ -49,10 +67,22 @@ end
 """
 
 
-async def acquire_lock(r: redis.Redis) -> str | None:
-    """Acquire tick lock.
+# Registered once per process: redis-py Script objects call EVALSHA and fall back to
+# loading the script on NOSCRIPT, so the script body isn't re-sent on every call.
+_scripts: dict[str, object] = {}
+
+
+def _script(r: redis.Redis, source: str):
+    script = _scripts.get(source)
+    if script is None:
+        script = _scripts[source] = r.register_script(source)
+    return script
+
 
-    Returns a lock token string when acquired, otherwise None.
+async def acquire_lock(r: redis.Redis) -> tuple[str, int] | None:
+    """Acquire tick lock and allocate the next tick id.
+
+    Returns (lock token, tick_id) when acquired, otherwise None.
 
     We store a random token as the lock value and only release if it matches,
     to avoid deleting somebody else's lock in edge cases (TTL expiry, slow tick,
@@ -60,38 +90,48 @@ async def acquire_lock(r: redis.Redis) -> str | None:
     """
 
     token = secrets.token_hex(16)
-    # SET key value NX EX
-    ok = await r.set(LOCK_KEY, token, nx=True, ex=LOCK_TTL_SECONDS)
-    return token if ok else None
+    tick_id = await _script(r, _ACQUIRE_LOCK_LUA)(
+        keys=[LOCK_KEY, TICK_SEQ_KEY],
+        args=[token, LOCK_TTL_SECONDS],
+        client=r,
+    )
+    return (token, int(tick_id)) if tick_id is not None else None
 
 
 async def release_lock(r: redis.Redis, *, token: str) -> None:
     try:
-        await r.eval(_RELEASE_LOCK_LUA, 1, LOCK_KEY, token)
+        await _script(r, _RELEASE_LOCK_LUA)(keys=[LOCK_KEY], args=[token], client=r)
     except Exception:
         log.exception("Failed to release lock")
 
 
-async def _lock_refresher(r: redis.Redis, *, token: str, interval_s: int = 30) -> None:
-    """Keep the tick lock alive while the tick is running.
+def queue_release_lock(pipe: redis.client.Pipeline, *, token: str) -> None:
+    """Queue the compare-and-delete release on a pipeline (sent with its other writes).
 
-    Without this, a long-running tick could outlive the TTL and allow another worker
-    to acquire the lock, causing overlapping work.
+    Plain EVAL on purpose: a registered Script on a pipeline makes execute() send an extra
+    SCRIPT EXISTS/LOAD round-trip first, which defeats the single-flush end of tick.
     """
 
-    interval_s = max(5, int(interval_s))
-    try:
-        while True:
-            await asyncio.sleep(interval_s)
-            try:
-                await r.eval(_REFRESH_LOCK_LUA, 1, LOCK_KEY, token, str(LOCK_TTL_SECONDS))
-            except Exception:
-                log.exception("Failed to refresh lock")
-    except asyncio.CancelledError:
+    pipe.eval(_RELEASE_LOCK_LUA, 1, LOCK_KEY, token)
+
+
+async def refresh_lock(r: redis.Redis, *, token: str | None) -> None:
+    """Extend the tick lock TTL at a work boundary inside the tick.
+
+    Replaces a background refresher task: the TTL already covers a whole tick
+    (LOCK_TTL_SECONDS), so renewing between tick steps and after each parsed channel
+    is enough.
+    """
+
+    if not token:
         return
+    try:
+        await _script(r, _REFRESH_LOCK_LUA)(keys=[LOCK_KEY], args=[token, LOCK_TTL_SECONDS], client=r)
+    except Exception:
+        log.exception("Failed to refresh lock")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class TickSummary:
     accounts_checked: int = 0
     accounts_active_total: int = 0
@@ -105,6 +145,46 @@ class TickSummary:
     posts_inserted: int = 0
 
 
+@dataclass(frozen=True, slots=True)
+class AccountPatch:
+    """New account state derived from one health check; applied to the row in one go."""
+
+    status: AccountStatus
+    last_error: str | None = None
+    cooldown_until: datetime | None = None
+    is_active: bool = True
+
+
+async def _compute_patch(service: TelethonAccountService, account_id: int) -> AccountPatch:
+    """Run the health check for one account. TelethonConfigError is global and propagates."""
+
+    try:
+        health = await service.check(account_id=account_id)
+    except TelethonConfigError:
+        raise
+    except Exception as e:
+        return AccountPatch(status=AccountStatus.error, last_error=f"{type(e).__name__}: {e}")
+
+    return AccountPatch(
+        status=health.status,
+        last_error=health.last_error,
+        cooldown_until=health.cooldown_until,
+        is_active=health.status != AccountStatus.banned,
+    )
+
+
+_account_service: TelethonAccountService | None = None
+
+
+def _get_account_service() -> TelethonAccountService:
+    """Process-wide service: built once and reused across ticks (its pool keeps clients warm)."""
+
+    global _account_service
+    if _account_service is None:
+        _account_service = TelethonAccountService(session_storage=DbSessionStorage(), pool=get_shared_pool())
+    return _account_service
+
+
 async def _update_accounts_status() -> TickSummary:
     """Minimal account health/status check.
 
@@ -119,85 +199,105 @@ async def _update_accounts_status() -> TickSummary:
 
     # Lazy init: keep worker booting even if Telethon deps/config missing.
     try:
-        service = TelethonAccountService(session_storage=DbSessionStorage())
+        service = _get_account_service()
     except Exception:  # pragma: no cover
         log.exception("telethon service init failed")
         return TickSummary()
 
-    with SessionLocal() as db:
-        account_ids = list(
-            db.execute(select(Account.id).where(Account.is_active.is_(True)).order_by(Account.id.asc())).scalars()
-        )
+    now = datetime.now(timezone.utc)
+
+    # Checks are independent network I/O: run them concurrently (bounded), then apply the
+    # results in one pass so the session is only touched from this coroutine.
+    sem = asyncio.Semaphore(max(1, int(get_settings().tick_concurrency)))
 
-        if not account_ids:
-            log.info("accounts: none")
-            return TickSummary()
+    async def _check_one(account_id: int) -> AccountPatch:
+        async with sem:
+            return await _compute_patch(service, account_id)
 
+    with SessionLocal() as db:
         checked = 0
-        for account_id in account_ids:
-            checked += 1
+        last_id = 0
+        config_error = False
+        while not config_error:
+            # Keyset pages: memory stays bounded by the page and every page commits on its own,
+            # so row locks aren't held for the whole pass. Accounts still cooling down are skipped:
+            # a probe can't change their state and only adds Telegram pressure. They keep
+            # status=cooldown, so the summary still counts them.
+            page = list(
+                db.execute(
+                    select(Account)
+                    .where(
+                        Account.is_active.is_(True),
+                        or_(Account.cooldown_until.is_(None), Account.cooldown_until <= now),
+                        Account.id > last_id,
+                    )
+                    .order_by(Account.id.asc())
+                    .limit(ACCOUNTS_PAGE_SIZE)
+                ).scalars()
+            )
+            if not page:
+                break
+            last_id = page[-1].id
 
-            try:
-                health = await service.check(account_id=account_id)
+            results = await asyncio.gather(*(_check_one(acc.id) for acc in page), return_exceptions=True)
 
-                acc = db.get(Account, account_id)
-                if not acc:
-                    continue
+            for acc, patch in zip(page, results):
+                if isinstance(patch, TelethonConfigError):
+                    # Config issue is global; no point iterating further.
+                    log.warning("telethon: config error: %s", patch)
+                    config_error = True
+                    break
+                if isinstance(patch, BaseException):
+                    raise patch
 
-                acc.status = health.status
-                acc.last_error = health.last_error
-                acc.cooldown_until = health.cooldown_until
+                checked += 1
 
                 # If Telegram freezes/bans the account, quarantine it automatically.
-                if health.status == AccountStatus.banned:
-                    if acc.is_active:
-                        msg = (
-                            f"⚠️ TG Parser: аккаунт заморожен/забанен. id={acc.id} phone={acc.phone_number or ''} err={health.last_error}"
-                        )
-                        await notify_admin(msg)
-                        await notify_team(msg)
-                    acc.is_active = False
-            except TelethonConfigError as e:
-                # Config issue is global; no point iterating further.
-                log.warning("telethon: config error: %s", e)
-                break
-            except Exception as e:
-                acc = db.get(Account, account_id)
-                if acc:
-                    acc.status = AccountStatus.error
-                    acc.last_error = f"{type(e).__name__}: {e}"
-            finally:
-                acc = db.get(Account, account_id)
-                if acc:
-                    acc.updated_at = datetime.now(timezone.utc)
-
-        db.commit()
-
-        # Summary counts (used for /status and for log line).
-        statuses = list(
+                if acc.is_active and not patch.is_active:
+                    msg = (
+                        f"⚠️ TG Parser: аккаунт заморожен/забанен. id={acc.id} phone={acc.phone_number or ''} err={patch.last_error}"
+                    )
+                    await notify_admin(msg)
+                    await notify_team(msg)
+
+                acc.status = patch.status
+                acc.last_error = patch.last_error
+                acc.cooldown_until = patch.cooldown_until
+                acc.is_active = patch.is_active
+                acc.updated_at = now
+
+            db.commit()
+
+        # Summary counts (used for /status and for log line), aggregated server-side. Always run,
+        # even if nothing was checked: accounts skipped for cooldown still count here.
+        counts = dict(
             db.execute(
-                select(Account.status).where(Account.is_active.is_(True))
-            ).scalars()
+                select(Account.status, func.count())
+                .where(Account.is_active.is_(True))
+                .group_by(Account.status)
+            ).all()
         )
 
         summary = TickSummary(
             accounts_checked=checked,
-            accounts_active_total=len(statuses),
-            accounts_auth_required=sum(1 for s in statuses if s == AccountStatus.auth_required),
-            accounts_cooldown=sum(1 for s in statuses if s == AccountStatus.cooldown),
-            accounts_banned=sum(1 for s in statuses if s == AccountStatus.banned),
-            accounts_error=sum(1 for s in statuses if s == AccountStatus.error),
+            accounts_active_total=sum(counts.values()),
+            accounts_auth_required=counts.get(AccountStatus.auth_required, 0),
+            accounts_cooldown=counts.get(AccountStatus.cooldown, 0),
+            accounts_banned=counts.get(AccountStatus.banned, 0),
+            accounts_error=counts.get(AccountStatus.error, 0),
         )
 
-        log.info(
-            "accounts: checked=%s active=%s auth_required=%s cooldown=%s banned=%s error=%s",
-            summary.accounts_checked,
-            summary.accounts_active_total,
-            summary.accounts_auth_required,
-            summary.accounts_cooldown,
-            summary.accounts_banned,
-            summary.accounts_error,
-        )
+        # Skip building the args tuple when INFO is off (short tick intervals).
+        if log.isEnabledFor(logging.INFO):
+            log.info(
+                "accounts: checked=%s active=%s auth_required=%s cooldown=%s banned=%s error=%s",
+                summary.accounts_checked,
+                summary.accounts_active_total,
+                summary.accounts_auth_required,
+                summary.accounts_cooldown,
+                summary.accounts_banned,
+                summary.accounts_error,
+            )
 
         return summary
 
@@ -208,52 +308,84 @@ async def _persist_tick_meta(
     tick_id: int,
     started_at: datetime,
     finished_at: datetime,
+    duration_s: float,
     summary: TickSummary,
+    pipe: redis.client.Pipeline | None = None,
 ) -> None:
-    duration_s = max(0.0, (finished_at - started_at).total_seconds())
+    duration_s = max(0.0, duration_s)
 
-    # Use a hash for readability/debugging.
-    await r.hset(
-        LAST_TICK_KEY,
-        mapping={
-            "tick_id": str(tick_id),
+    # One compact JSON value (still readable via `redis-cli GET`): a single SET with TTL instead
+    # of a stringified field-per-counter hash. Also overwrites a legacy hash at this key.
+    payload = json.dumps(
+        {
+            "tick_id": tick_id,
             "started_at": started_at.isoformat(),
             "finished_at": finished_at.isoformat(),
-            "duration_s": f"{duration_s:.3f}",
-            "accounts_checked": str(summary.accounts_checked),
-            "accounts_active_total": str(summary.accounts_active_total),
-            "accounts_auth_required": str(summary.accounts_auth_required),
-            "accounts_cooldown": str(summary.accounts_cooldown),
-            "accounts_banned": str(summary.accounts_banned),
-            "accounts_error": str(summary.accounts_error),
-            "channels_checked": str(summary.channels_checked),
-            "channels_total": str(summary.channels_total),
-            "posts_inserted": str(summary.posts_inserted),
+            "duration_s": round(duration_s, 3),
+            **asdict(summary),
         },
+        separators=(",", ":"),
     )
 
+    # With a caller pipeline the write is only queued; the caller flushes it with its own.
+    if pipe is not None:
+        pipe.set(LAST_TICK_KEY, payload, ex=LAST_TICK_TTL_SECONDS)
+    else:
+        await r.set(LAST_TICK_KEY, payload, ex=LAST_TICK_TTL_SECONDS)
 
-async def tick(r: redis.Redis, *, tick_id: int) -> None:
-    started = datetime.now(timezone.utc)
-
-    summary = await _update_accounts_status()
 
-    # Membership maintenance (v1): proactively ensure account<->channel joins for private channels.
-    # This reduces wasted ticks where parser can't see entities in dialogs.
-    try:
-        mem_summary = await ensure_membership_once()
-        log.info(
-            "membership: ok channels=%s touched=%s updated=%s cooldown_marked=%s",
-            mem_summary.channels_total,
-            mem_summary.channels_touched,
-            mem_summary.memberships_updated,
-            mem_summary.accounts_cooldown_marked,
+async def tick(
+    r: redis.Redis,
+    *,
+    tick_id: int,
+    pipe: redis.client.Pipeline | None = None,
+    lock_token: str | None = None,
+) -> None:
+    # One wall-clock read per tick: passed down so every step sees the same `now`.
+    # Duration comes from the monotonic clock (immune to wall-clock jumps).
+    started = datetime.now(timezone.utc)
+    t0 = time.monotonic()
+
+    async def _accounts() -> TickSummary:
+        accounts_summary = await _update_accounts_status()
+        await refresh_lock(r, token=lock_token)
+        return accounts_summary
+
+    async def _channels() -> ParseSummary:
+        # Membership maintenance (v1): proactively ensure account<->channel joins for private channels.
+        # This reduces wasted ticks where parser can't see entities in dialogs.
+        try:
+            mem_summary = await ensure_membership_once(now=started)
+            log.info(
+                "membership: ok channels=%s touched=%s updated=%s cooldown_marked=%s",
+                mem_summary.channels_total,
+                mem_summary.channels_touched,
+                mem_summary.memberships_updated,
+                mem_summary.accounts_cooldown_marked,
+            )
+        except Exception:
+            log.exception("membership: step failed")
+        await refresh_lock(r, token=lock_token)
+
+        # Parser engine (v1): incremental fetch + persist + dedupe.
+        # The parse phase is the long one: renew the lock as channels finish.
+        return await parse_new_posts_once(
+            now=started,
+            on_channel_done=functools.partial(refresh_lock, r, token=lock_token),
         )
-    except Exception:
-        log.exception("membership: step failed")
 
-    # Parser engine (v1): incremental fetch + persist + dedupe.
-    parse_summary = await parse_new_posts_once()
+    # Health probes and channel work overlap their Telegram I/O. Both borrow clients from the
+    # shared pool, which serializes per account, so one auth key never has two live connections.
+    # return_exceptions: a failing side must not abandon the other mid-flight.
+    summary, parse_summary = await asyncio.gather(_accounts(), _channels(), return_exceptions=True)
+    if isinstance(summary, BaseException):
+        if not isinstance(summary, Exception):
+            raise summary
+        log.error("accounts: step failed", exc_info=summary)
+        summary = TickSummary()
+    if isinstance(parse_summary, BaseException):
+        raise parse_summary
+
     summary = replace(
         summary,
         channels_checked=parse_summary.channels_checked,
@@ -262,47 +394,65 @@ async def tick(r: redis.Redis, *, tick_id: int) -> None:
     )
 
     finished = datetime.now(timezone.utc)
+    duration_s = time.monotonic() - t0
     await _persist_tick_meta(
         r,
         tick_id=tick_id,
         started_at=started,
         finished_at=finished,
+        duration_s=duration_s,
         summary=summary,
+        pipe=pipe,
     )
 
-    log.info(
-        "tick: ok id=%s duration_s=%.3f accounts_checked=%s errors=%s channels=%s/%s posts_inserted=%s",
-        tick_id,
-        (finished - started).total_seconds(),
-        summary.accounts_checked,
-        summary.accounts_error,
-        summary.channels_checked,
-        summary.channels_total,
-        summary.posts_inserted,
-    )
+    if log.isEnabledFor(logging.INFO):
+        log.info(
+            "tick: ok id=%s duration_s=%.3f accounts_checked=%s errors=%s channels=%s/%s posts_inserted=%s",
+            tick_id,
+            duration_s,
+            summary.accounts_checked,
+            summary.accounts_error,
+            summary.channels_checked,
+            summary.channels_total,
+            summary.posts_inserted,
+        )
 
 
 async def main() -> None:
     logging.basicConfig(level=logging.INFO)
 
-    r = redis.from_url(settings.redis_url)
-
-    while True:
-        token = await acquire_lock(r)
-        if not token:
-            log.info("tick: skipped (lock held)")
-        else:
-            tick_id = int(await r.incr(TICK_SEQ_KEY))
-            refresher = asyncio.create_task(_lock_refresher(r, token=token))
-            try:
-                await tick(r, tick_id=tick_id)
-            finally:
-                refresher.cancel()
-                with contextlib.suppress(Exception):
-                    await refresher
-                await release_lock(r, token=token)
-
-        await asyncio.sleep(settings.tick_interval_seconds)
+    r = redis.from_url(get_settings().redis_url)
+
+    # Fixed cadence off the monotonic clock: a slow tick doesn't push later ticks back, and
+    # ticks missed while running long are skipped instead of firing back-to-back.
+    loop = asyncio.get_running_loop()
+    interval = max(1, int(get_settings().tick_interval_seconds))
+    next_deadline = loop.time()
+
+    try:
+        while True:
+            await asyncio.sleep(max(0.0, next_deadline - loop.time()))
+            next_deadline += interval
+
+            acquired = await acquire_lock(r)
+            if not acquired:
+                log.info("tick: skipped (lock held)")
+            else:
+                token, tick_id = acquired
+                try:
+                    await tick(r, tick_id=tick_id, lock_token=token)
+                finally:
+                    await release_lock(r, token=token)
+
+            now = loop.time()
+            if next_deadline <= now:
+                skipped = int((now - next_deadline) // interval) + 1
+                next_deadline += skipped * interval
+                log.warning("tick: overran interval, skipping %s tick(s)", skipped)
+    finally:
+        # Graceful shutdown: pooled Telethon clients stay connected between ticks.
+        await get_shared_pool().close_all()
+        await r.aclose()
 
 
 if __name__ == "__main__":